@@ -1,8 +1,19 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, make_response
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, jsonify, make_response, send_file
 from flask_login import login_required, current_user
 from app import db
-from models import AppearanceSettings, Category, Tool, User
+from models import AppearanceSettings, Category, Tool, User, Job, tool_categories, TOOL_LIST_OPTIONS
+from sqlalchemy import cast, insert, or_
+from sqlalchemy.orm import contains_eager, selectinload
 import json
+import os
+import bulk_tools
+import db_profiles
+import jobs
+import profiler
+import replica
+import rollups
+import slugs
+import user_cache
 
 admin = Blueprint('admin', __name__)
 
@@ -56,8 +67,94 @@ def manage_tools():
         flash('Access denied. Admin rights required.', 'danger')
         return redirect(url_for('index'))
     
-    tools = Tool.query.order_by(Tool.created_at.desc()).all()
-    return render_template('admin/manage_tools.html', tools=tools)
+    pagination = _tools_listing(request.args)
+    return render_template('admin/manage_tools.html', tools=pagination.items, pagination=pagination)
+
+@admin.route('/admin/manage-tools/data')
+@login_required
+def manage_tools_data():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    pagination = _tools_listing(request.args)
+    return jsonify(_page_dict(pagination, [{
+        'id': tool.id,
+        'name': tool.name,
+        'categories': [category.name for category in tool.categories],
+        'author': tool.author.username if tool.author else None,
+        'is_approved': tool.is_approved,
+        'created_at': tool.created_at.isoformat() if tool.created_at else None
+    } for tool in pagination.items]))
+
+ADMIN_PER_PAGE = 50
+ADMIN_MAX_PER_PAGE = 200
+
+TOOL_SORT_COLUMNS = {
+    'name': Tool.name,
+    'created_at': Tool.created_at,
+    'status': Tool.is_approved,
+    'author': User.username
+}
+
+USER_SORT_COLUMNS = {
+    'username': User.username,
+    'email': User.email,
+    'is_admin': User.is_admin,
+    'is_moderator': User.is_moderator
+}
+
+def _order_by(args, columns, default_sort, default_direction):
+    sort = args.get('sort')
+    if sort not in columns:
+        return columns[default_sort].desc() if default_direction == 'desc' else columns[default_sort].asc()
+    return columns[sort].desc() if args.get('direction') == 'desc' else columns[sort].asc()
+
+def _paginate(query, args):
+    per_page = min(args.get('per_page', ADMIN_PER_PAGE, type=int) or ADMIN_PER_PAGE, ADMIN_MAX_PER_PAGE)
+    return query.paginate(page=args.get('page', 1, type=int), per_page=per_page, error_out=False)
+
+def _page_dict(pagination, items):
+    return {
+        'items': items,
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'per_page': pagination.per_page,
+        'total': pagination.total
+    }
+
+def _tools_listing(args):
+    # Only the requested page is loaded; categories and author come in batched queries
+    query = Tool.query.join(User, User.id == Tool.user_id)\
+        .options(selectinload(Tool.categories), contains_eager(Tool.author), *TOOL_LIST_OPTIONS)
+    
+    search = args.get('q', '').strip()
+    if search:
+        query = query.filter(Tool.name.ilike(f'%{search}%'))
+    
+    status = args.get('status')
+    if status == 'approved':
+        query = query.filter(Tool.is_approved == True)
+    elif status == 'pending':
+        query = query.filter(Tool.is_approved == False)
+    
+    query = query.order_by(_order_by(args, TOOL_SORT_COLUMNS, 'created_at', 'desc'), Tool.id.desc())
+    return _paginate(query, args)
+
+def _users_listing(args):
+    query = User.query
+    
+    search = args.get('q', '').strip()
+    if search:
+        query = query.filter(or_(User.username.ilike(f'%{search}%'), User.email.ilike(f'%{search}%')))
+    
+    role = args.get('role')
+    if role == 'admin':
+        query = query.filter(User.is_admin == True)
+    elif role == 'moderator':
+        query = query.filter(User.is_moderator == True)
+    
+    query = query.order_by(_order_by(args, USER_SORT_COLUMNS, 'username', 'asc'), User.id)
+    return _paginate(query, args)
 
 @admin.route('/admin/delete-tools', methods=['POST'])
 @login_required
@@ -65,18 +162,62 @@ def delete_tools():
     if not current_user.is_admin:
         return jsonify({'error': 'Access denied'}), 403
     
-    tool_ids = request.form.getlist('tool_ids')
+    tool_ids = request.form.getlist('tool_ids', type=int)
     if not tool_ids:
         return jsonify({'error': 'No tools selected'}), 400
     
     try:
-        Tool.query.filter(Tool.id.in_(tool_ids)).delete(synchronize_session=False)
-        db.session.commit()
-        return jsonify({'success': True})
+        job = jobs.submit('delete_tools', _delete_tools_job, tool_ids, user_id=current_user.id)
+        return jsonify({'success': True, 'job_id': job.id})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _delete_tools_job(job, tool_ids):
+    jobs.update_progress(job, 0, total=len(tool_ids))
+    counts = bulk_tools.delete_tools(tool_ids, progress=lambda done: jobs.update_progress(job, done))
+    return (f"Deleted {counts['tools']} tools, {counts['comments']} comments, "
+            f"{counts['comment_votes']} comment votes, {counts['tool_votes']} tool votes "
+            f"and {counts['tool_categories']} category links.")
+
+ANALYTICS_DAYS = 30
+
+@admin.route('/admin/analytics')
+@login_required
+def analytics():
+    if not current_user.is_admin:
+        flash('Access denied. Admin rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    window = request.args.get('window', 'week')
+    if window not in rollups.WINDOWS:
+        window = 'week'
+    leaders = rollups.leaderboard(rollups.WINDOWS[window])
+    daily = rollups.daily_totals(ANALYTICS_DAYS)
+    refreshed_at, pending = rollups.status()
+    
+    job_id = request.args.get('job', type=int)
+    job = Job.query.get(job_id) if job_id else None
+    return render_template('admin/analytics.html', window=window, windows=rollups.WINDOWS, leaders=leaders,
+                           daily=daily, days=ANALYTICS_DAYS, refreshed_at=refreshed_at, pending=pending, job=job)
+
+@admin.route('/admin/analytics/refresh', methods=['POST'])
+@login_required
+def refresh_analytics():
+    if not current_user.is_admin:
+        flash('Access denied. Admin rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    rebuild = bool(request.form.get('rebuild'))
+    job = jobs.submit('rollup_votes', _rollup_votes_job, rebuild, user_id=current_user.id)
+    return redirect(url_for('admin.analytics', job=job.id))
+
+def _rollup_votes_job(job, rebuild):
+    def progress(done, total):
+        jobs.update_progress(job, done, total=total)
+    refresh = rollups.rebuild_tool_vote_daily if rebuild else rollups.refresh_tool_vote_daily
+    return f'Rolled up {refresh(progress=progress)} votes.'
+
 @admin.route('/admin/categories')
 @login_required
 def categories():
@@ -110,7 +251,7 @@ def add_category():
     category.description = description
     
     try:
-        db.session.add(category)
+        slugs.assign_slug(category, name, fallback='category')
         db.session.commit()
         flash('Category added successfully!', 'success')
     except Exception as e:
@@ -210,43 +351,57 @@ def import_tools():
             elif not isinstance(tools_data, list):
                 raise ValueError("Invalid JSON format: must be an array or object of tools")
             
-            for tool_data in tools_data:
-                if not isinstance(tool_data, dict):
-                    continue
-                    
-                tool = Tool()
-                tool.name = str(tool_data.get('name', ''))
-                tool.description = str(tool_data.get('description', ''))
-                tool.url = str(tool_data.get('url', ''))
-                tool.image_url = str(tool_data.get('image_url', '')) or None
-                tool.youtube_url = str(tool_data.get('youtube_url', '')) or None
-                tool.resources = json.dumps(tool_data.get('resources', []))
-                tool.user_id = current_user.id
-                tool.is_approved = True
-                
-                # Handle categories
-                categories = []
-                cat_names = tool_data.get('categories', [])
-                if isinstance(cat_names, list):
-                    for cat_name in cat_names:
-                        category = Category.query.filter_by(name=str(cat_name)).first()
-                        if category:
-                            categories.append(category)
-                tool.categories = categories
-                
-                db.session.add(tool)
-            
-            db.session.commit()
-            flash('Tools imported successfully!', 'success')
+            job = jobs.submit('import_tools', _import_tools_job, tools_data, current_user.id, user_id=current_user.id)
+            flash('Tool import started.', 'info')
+            return redirect(url_for('admin.import_tools', job=job.id))
         except json.JSONDecodeError:
             flash('Invalid JSON file format', 'danger')
         except Exception as e:
-            db.session.rollback()
             flash(f'Error importing tools: {str(e)}', 'danger')
         
         return redirect(url_for('admin.import_tools'))
     
-    return render_template('admin/import_tools.html')
+    job_id = request.args.get('job', type=int)
+    job = Job.query.get(job_id) if job_id else None
+    return render_template('admin/import_tools.html', job=job)
+
+IMPORT_TOOLS_BATCH_SIZE = 200
+
+def _import_tools_job(job, tools_data, owner_id):
+    categories_by_name = {category.name: category for category in Category.query.all()}
+    tool_slugs = slugs.SlugAllocator(Tool.slug)
+    tools_data = [tool_data for tool_data in tools_data if isinstance(tool_data, dict)]
+    jobs.update_progress(job, 0, total=len(tools_data))
+    
+    for index, tool_data in enumerate(tools_data, 1):
+        tool = Tool()
+        tool.name = str(tool_data.get('name', ''))
+        tool.slug = tool_slugs.allocate(tool.name, fallback='tool')
+        tool.description = str(tool_data.get('description', ''))
+        tool.url = str(tool_data.get('url', ''))
+        tool.image_url = str(tool_data.get('image_url', '')) or None
+        tool.youtube_url = str(tool_data.get('youtube_url', '')) or None
+        tool.resources = tool_data.get('resources', [])
+        tool.user_id = owner_id
+        tool.is_approved = True
+        
+        # Handle categories
+        categories = []
+        cat_names = tool_data.get('categories', [])
+        if isinstance(cat_names, list):
+            for cat_name in cat_names:
+                category = categories_by_name.get(str(cat_name))
+                if category:
+                    categories.append(category)
+        tool.categories = categories
+        
+        # Committed with the job's status at the end, so a failed import adds nothing
+        db.session.add(tool)
+        if index % IMPORT_TOOLS_BATCH_SIZE == 0:
+            jobs.update_progress(job, index)
+    
+    jobs.update_progress(job, len(tools_data))
+    return f'Imported {len(tools_data)} tools.'
 
 @admin.route('/admin/export-tools')
 @login_required
@@ -255,23 +410,42 @@ def export_tools():
         flash('Access denied. Admin rights required.', 'danger')
         return redirect(url_for('index'))
     
-    tools = Tool.query.all()
-    tools_data = []
-    
-    for tool in tools:
-        tool_data = {
-            'name': tool.name,
-            'description': tool.description,
-            'url': tool.url,
-            'image_url': tool.image_url,
-            'youtube_url': tool.youtube_url,
-            'categories': [cat.name for cat in tool.categories],
-            'resources': json.loads(tool.resources) if tool.resources else [],
-            'created_at': tool.created_at.isoformat()
-        }
-        tools_data.append(tool_data)
-    
-    return jsonify(tools_data)
+    job = jobs.submit('export_tools', _export_tools_job, user_id=current_user.id)
+    flash('Tool export started. The download link appears when it finishes.', 'info')
+    return redirect(url_for('admin.import_tools', job=job.id))
+
+def _export_tools_job(job):
+    # Resources are emitted exactly as stored rather than decoded and re-encoded
+    rows = db.session.query(
+        Tool.id, Tool.name, Tool.description, Tool.url, Tool.image_url,
+        Tool.youtube_url, Tool.created_at, cast(Tool.resources, db.Text)
+    ).order_by(Tool.id).all()
+
+    category_names = {}
+    for tool_id, category_name in db.session.query(tool_categories.c.tool_id, Category.name)\
+            .join(Category, Category.id == tool_categories.c.category_id):
+        category_names.setdefault(tool_id, []).append(category_name)
+
+    jobs.update_progress(job, 0, total=len(rows))
+    with jobs.result_file(job, 'tools_export.json') as out:
+        out.write('[')
+        for index, (tool_id, name, description, url, image_url, youtube_url, created_at, resources_json) in enumerate(rows):
+            tool_data = json.dumps({
+                'name': name,
+                'description': description,
+                'url': url,
+                'image_url': image_url,
+                'youtube_url': youtube_url,
+                'categories': category_names.get(tool_id, []),
+                'created_at': created_at.isoformat() if created_at else None
+            })
+            if index:
+                out.write(',')
+            out.write(f'{tool_data[:-1]}, "resources": {resources_json or "[]"}}}')
+        out.write(']')
+    
+    jobs.update_progress(job, len(rows))
+    return f'Exported {len(rows)} tools.'
 
 @admin.route('/admin/change-password', methods=['GET', 'POST'])
 @login_required
@@ -285,7 +459,8 @@ def change_password():
         new_password = request.form.get('new_password')
         confirm_password = request.form.get('confirm_password')
         
-        if not current_user.check_password(current_password):
+        user = User.query.get(current_user.id)
+        if not user.check_password(current_password):
             flash('Current password is incorrect.', 'danger')
             return redirect(url_for('admin.change_password'))
         
@@ -297,8 +472,9 @@ def change_password():
             flash('Password must be at least 6 characters long.', 'danger')
             return redirect(url_for('admin.change_password'))
         
-        current_user.set_password(new_password)
+        user.set_password(new_password)
         db.session.commit()
+        user_cache.invalidate_user(user.id)
         
         flash('Password changed successfully!', 'success')
         return redirect(url_for('index'))
@@ -312,8 +488,25 @@ def manage_users():
         flash('Access denied. Admin rights required.', 'danger')
         return redirect(url_for('index'))
     
-    users = User.query.order_by(User.username).all()
-    return render_template('admin/manage_users.html', users=users)
+    pagination = _users_listing(request.args)
+    job_id = request.args.get('job', type=int)
+    job = Job.query.get(job_id) if job_id else None
+    return render_template('admin/manage_users.html', users=pagination.items, pagination=pagination, job=job)
+
+@admin.route('/admin/manage-users/data')
+@login_required
+def manage_users_data():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    pagination = _users_listing(request.args)
+    return jsonify(_page_dict(pagination, [{
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'is_admin': user.is_admin,
+        'is_moderator': user.is_moderator
+    } for user in pagination.items]))
 
 @admin.route('/admin/edit-user-roles/<int:user_id>', methods=['POST'])
 @login_required
@@ -331,6 +524,7 @@ def edit_user_roles(user_id):
     
     try:
         db.session.commit()
+        user_cache.invalidate_user(user.id)
         flash('User roles updated successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -357,6 +551,7 @@ def delete_user(user_id):
     try:
         db.session.delete(user)
         db.session.commit()
+        user_cache.invalidate_user(user_id)
         flash('User deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -371,23 +566,26 @@ def export_users():
         flash('Access denied. Admin rights required.', 'danger')
         return redirect(url_for('index'))
     
-    users = User.query.all()
-    users_data = []
-    
-    for user in users:
-        user_data = {
-            'username': user.username,
-            'email': user.email,
-            'is_moderator': user.is_moderator,
-            'is_admin': user.is_admin,
-            'created_at': user.created_at.isoformat() if hasattr(user, 'created_at') else None
-        }
-        users_data.append(user_data)
-    
-    response = make_response(json.dumps(users_data, indent=2))
-    response.headers['Content-Type'] = 'application/json'
-    response.headers['Content-Disposition'] = 'attachment; filename=users_export.json'
-    return response
+    job = jobs.submit('export_users', _export_users_job, user_id=current_user.id)
+    flash('User export started. The download link appears when it finishes.', 'info')
+    return redirect(url_for('admin.manage_users', job=job.id))
+
+def _export_users_job(job):
+    rows = db.session.query(User.username, User.email, User.is_moderator, User.is_admin)\
+        .order_by(User.id).all()
+    
+    users_data = [{
+        'username': username,
+        'email': email,
+        'is_moderator': is_moderator,
+        'is_admin': is_admin
+    } for username, email, is_moderator, is_admin in rows]
+    
+    with jobs.result_file(job, 'users_export.json') as out:
+        json.dump(users_data, out, indent=2)
+    
+    jobs.update_progress(job, len(users_data), total=len(users_data))
+    return f'Exported {len(users_data)} users.'
 
 @admin.route('/admin/import-users', methods=['POST'])
 @login_required
@@ -415,24 +613,147 @@ def import_users():
         
         if isinstance(users_data, dict):
             users_data = [users_data]
+        elif not isinstance(users_data, list):
+            raise ValueError("Invalid JSON format: must be an array or object of users")
         
-        for user_data in users_data:
-            if User.query.filter_by(email=user_data.get('email')).first():
-                continue
-                
-            user = User()
-            user.username = user_data.get('username')
-            user.email = user_data.get('email')
-            user.is_moderator = user_data.get('is_moderator', False)
-            user.is_admin = user_data.get('is_admin', False)
-            user.set_password('temppass123')  # Set a temporary password
-            
-            db.session.add(user)
-        
-        db.session.commit()
-        flash('Users imported successfully! Default password set to "temppass123"', 'success')
+        job = jobs.submit('import_users', _import_users_job, users_data, user_id=current_user.id)
+        flash('User import started. Imported users get the password "temppass123".', 'info')
+        return redirect(url_for('admin.manage_users', job=job.id))
     except Exception as e:
-        db.session.rollback()
         flash(f'Error importing users: {str(e)}', 'danger')
     
-    return redirect(url_for('admin.manage_users'))
\ No newline at end of file
+    return redirect(url_for('admin.manage_users'))
+
+IMPORT_USERS_BATCH_SIZE = 500
+
+def _import_users_job(job, users_data):
+    # Process pools (multiprocessing) are only needed here, so keep them off the startup path
+    import passwords
+    
+    # One query for every existing email/username instead of one per row
+    existing_emails = {email for (email,) in db.session.query(User.email)}
+    existing_usernames = {username for (username,) in db.session.query(User.username)}
+    
+    new_users = []
+    for user_data in users_data:
+        if not isinstance(user_data, dict):
+            continue
+        email = user_data.get('email')
+        username = user_data.get('username')
+        if not email or not username or email in existing_emails or username in existing_usernames:
+            continue
+        existing_emails.add(email)
+        existing_usernames.add(username)
+        new_users.append({
+            'username': username,
+            'email': email,
+            'is_moderator': bool(user_data.get('is_moderator', False)),
+            'is_admin': bool(user_data.get('is_admin', False))
+        })
+    
+    jobs.update_progress(job, 0, total=len(new_users))
+    
+    with passwords.hash_pool() as pool:
+        for start in range(0, len(new_users), IMPORT_USERS_BATCH_SIZE):
+            batch = new_users[start:start + IMPORT_USERS_BATCH_SIZE]
+            hashes = passwords.hash_passwords(pool, ['temppass123'] * len(batch))
+            for user_row, password_hash in zip(batch, hashes):
+                user_row['password_hash'] = password_hash
+            db.session.execute(insert(User), batch)
+            # Committed per batch; a re-run skips the users already imported
+            db.session.commit()
+            jobs.update_progress(job, start + len(batch))
+    
+    skipped = len(users_data) - len(new_users)
+    return f'Imported {len(new_users)} users, skipped {skipped} (already exist or invalid).'
+
+@admin.route('/admin/jobs')
+@login_required
+def job_list():
+    if not current_user.is_admin:
+        flash('Access denied. Admin rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    jobs.fail_stale_jobs()
+    recent_jobs = Job.query.order_by(Job.created_at.desc()).limit(50).all()
+    return render_template('admin/jobs.html', jobs=recent_jobs)
+
+@admin.route('/admin/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    jobs.fail_stale_jobs()
+    job = Job.query.get_or_404(job_id)
+    data = job.to_dict()
+    if job.result_path:
+        data['result_url'] = url_for('admin.job_result', job_id=job.id)
+    return jsonify(data)
+
+@admin.route('/admin/jobs/<int:job_id>/result')
+@login_required
+def job_result(job_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    job = Job.query.get_or_404(job_id)
+    if job.status != 'finished' or not job.result_path or not os.path.exists(job.result_path):
+        flash('This job has no downloadable result.', 'warning')
+        return redirect(url_for('admin.job_list'))
+    
+    return send_file(job.result_path, as_attachment=True, download_name=job.result_filename)
+
+@admin.route('/admin/db-pool')
+@login_required
+def db_pool():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = db_profiles.pool_metrics(db.engine)
+    data['profile'] = current_app.config['DB_PROFILE']
+    if replica.BIND_KEY in db.engines:
+        data['replica'] = db_profiles.pool_metrics(db.engines[replica.BIND_KEY])
+    return jsonify(data)
+
+@admin.route('/admin/profiles')
+@login_required
+def profile_list():
+    if not current_user.is_admin:
+        flash('Access denied. Admin rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    profiles = profiler.list_profiles(current_app.config['PROFILE_DIR'])
+    return render_template('admin/profiles.html', profiles=profiles,
+                           sample_rate=current_app.config['PROFILE_SAMPLE_RATE'])
+
+@admin.route('/admin/profiles/<name>')
+@login_required
+def profile_detail(name):
+    if not current_user.is_admin:
+        flash('Access denied. Admin rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    path = profiler.profile_path(current_app.config['PROFILE_DIR'], name)
+    if not path:
+        flash('Profile not found.', 'warning')
+        return redirect(url_for('admin.profile_list'))
+    
+    # The sidecar may have been pruned or written only part-way
+    meta = profiler.load_meta(path)
+    own, total = profiler.summarize(path)
+    return render_template('admin/profile.html', name=name, meta=meta, own=own, total=total)
+
+@admin.route('/admin/profiles/<name>/folded')
+@login_required
+def profile_download(name):
+    if not current_user.is_admin:
+        flash('Access denied. Admin rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    path = profiler.profile_path(current_app.config['PROFILE_DIR'], name)
+    if not path:
+        flash('Profile not found.', 'warning')
+        return redirect(url_for('admin.profile_list'))
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=name + '.folded')
@@ -1,74 +1,118 @@
-from flask import Blueprint, jsonify
-from models import Tool, Category
+from flask import Blueprint, jsonify, request
+from models import Tool, Category, TOOL_LIST_OPTIONS
 from sqlalchemy import desc, func, or_
 from app import db
+import rollups
+import votes
 
 api = Blueprint('api', __name__, url_prefix='/api/v1')
 
-@api.route('/tools', methods=['GET'])
-def get_tools():
-    tools = Tool.query.filter_by(is_approved=True).all()
+def tool_summary(tool, vote_total, description=False):
+    data = {
+        'id': tool.id,
+        'name': tool.name,
+        'slug': tool.slug,
+        'summary': tool.summary,
+        'url': tool.url,
+        'categories': [{
+            'id': category.id,
+            'name': category.name
+        } for category in tool.categories],
+        'votes': vote_total,
+        'created_at': tool.created_at.isoformat()
+    }
+    if description:
+        data['description'] = tool.description
+    return data
+
+def tool_detail(tool):
+    comments = tool.comments
+    totals = votes.totals(tools=[tool], comments=comments)
+    data = tool_summary(tool, totals['tool'][tool.id], description=True)
+    data['comments'] = [{
+        'id': comment.id,
+        'content': comment.content,
+        'votes': totals['comment'][comment.id],
+        'created_at': comment.created_at.isoformat()
+    } for comment in comments]
+    return data
+
+def category_summary(category):
+    return {
+        'id': category.id,
+        'name': category.name,
+        'slug': category.slug,
+        'description': category.description
+    }
+
+def _wants_description():
+    # Lists carry the short summary; ?fields=description adds the full HTML description
+    return 'description' in request.args.get('fields', '').split(',')
+
+def _tool_list(query):
+    description = _wants_description()
+    if not description:
+        query = query.options(*TOOL_LIST_OPTIONS)
+    tools = query.all()
+    totals = votes.totals(tools=tools)['tool']
     return jsonify({
-        'tools': [{
-            'id': tool.id,
-            'name': tool.name,
-            'description': tool.description,
-            'url': tool.url,
-            'category': {
-                'id': tool.category.id,
-                'name': tool.category.name
-            },
-            'votes': tool.vote_count,
-            'created_at': tool.created_at.isoformat()
-        } for tool in tools]
+        'tools': [tool_summary(tool, totals[tool.id], description) for tool in tools]
     })
 
+@api.route('/tools', methods=['GET'])
+def get_tools():
+    return _tool_list(Tool.query.filter_by(is_approved=True))
+
 @api.route('/tools/<int:tool_id>', methods=['GET'])
 def get_tool(tool_id):
     tool = Tool.query.filter_by(id=tool_id, is_approved=True).first()
     if not tool:
         return jsonify({'error': 'Tool not found'}), 404
-    
-    return jsonify({
-        'id': tool.id,
-        'name': tool.name,
-        'description': tool.description,
-        'url': tool.url,
-        'category': {
-            'id': tool.category.id,
-            'name': tool.category.name
-        },
-        'votes': tool.vote_count,
-        'created_at': tool.created_at.isoformat(),
-        'comments': [{
-            'id': comment.id,
-            'content': comment.content,
-            'votes': comment.vote_count,
-            'created_at': comment.created_at.isoformat()
-        } for comment in tool.comments]
-    })
+
+    return jsonify(tool_detail(tool))
 
 @api.route('/categories', methods=['GET'])
 def get_categories():
     categories = Category.query.all()
     return jsonify({
-        'categories': [{
-            'id': category.id,
-            'name': category.name,
-            'description': category.description
-        } for category in categories]
+        'categories': [category_summary(category) for category in categories]
     })
 
 @api.route('/categories/<int:category_id>/tools', methods=['GET'])
 def get_tools_by_category(category_id):
-    tools = Tool.query.filter_by(category_id=category_id, is_approved=True).all()
+    return _tool_list(Tool.query.filter(Tool.categories.any(Category.id == category_id), Tool.is_approved == True))
+
+LEADERBOARD_MAX_LIMIT = 100
+
+@api.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    window = request.args.get('window', 'week')
+    if window not in rollups.WINDOWS:
+        return jsonify({'error': f"window must be one of: {', '.join(rollups.WINDOWS)}"}), 400
+    limit = min(request.args.get('limit', 20, type=int), LEADERBOARD_MAX_LIMIT)
+    rows = rollups.leaderboard(rollups.WINDOWS[window], limit=limit, category_id=request.args.get('category', type=int))
     return jsonify({
+        'window': window,
         'tools': [{
-            'id': tool.id,
-            'name': tool.name,
-            'description': tool.description,
-            'url': tool.url,
-            'votes': tool.vote_count,
-            'created_at': tool.created_at.isoformat()
-        } for tool in tools]
+            'id': tool_id,
+            'name': name,
+            'slug': slug,
+            'upvotes': upvotes,
+            'downvotes': downvotes,
+            'votes': upvotes - downvotes
+        } for tool_id, name, slug, upvotes, downvotes in rows]
+    })
+
+@api.route('/tools/<int:tool_id>/votes/daily', methods=['GET'])
+def get_tool_daily_votes(tool_id):
+    if not db.session.query(Tool.id).filter_by(id=tool_id, is_approved=True).first():
+        return jsonify({'error': 'Tool not found'}), 404
+    days = max(1, min(request.args.get('days', 30, type=int), rollups.WINDOWS['year']))
+    return jsonify({
+        'tool_id': tool_id,
+        'days': [{
+            'day': day.isoformat(),
+            'upvotes': upvotes,
+            'downvotes': downvotes
+        } for day, upvotes, downvotes in rollups.daily_totals(days, tool_id=tool_id)]
     })
@@ -3,31 +3,90 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 import os
 import json
+import functools
+import compression
+import db_profiles
+import metrics
+import profiler
+import ratelimit
+import replica
+import template_cache
+import user_cache
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-    'connect_args': {
-        'sslmode': 'require'
-    }
-}
-
-db = SQLAlchemy(app)
+# Serve a thumbnail placeholder and only load the YouTube iframe on click
+app.config['YOUTUBE_LITE_EMBED'] = os.environ.get('YOUTUBE_LITE_EMBED', 'true').lower() != 'false'
+# Templates only change on deploy, so outside debug mode never stat their sources on render
+templates_auto_reload = os.environ.get('TEMPLATES_AUTO_RELOAD')
+app.config['TEMPLATES_AUTO_RELOAD'] = templates_auto_reload.lower() == 'true' if templates_auto_reload else None
+# Output of compile_templates.py; when unset, compiled bytecode is cached in JINJA_CACHE_DIR
+app.config['TEMPLATE_MODULES_DIR'] = os.environ.get('TEMPLATE_MODULES_DIR')
+app.config['JINJA_CACHE_DIR'] = os.environ.get('JINJA_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+template_cache.configure(app)
+# gzip (and brotli when installed) for dynamic responses; static files are pre-compressed by compress_static.py
+app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', 'true').lower() != 'false'
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', compression.DEFAULT_MIN_SIZE))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+app.config['COMPRESS_BR_QUALITY'] = int(os.environ.get('COMPRESS_BR_QUALITY', 4))
+# Registered first so it runs after every other after_request hook
+compression.init_app(app)
+# gunicorn, serverless, pgbouncer or sqlite; detected from the environment when unset
+app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE') or db_profiles.detect_profile(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_profiles.engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config['DB_PROFILE'])
+# Optional read replica for read-only public views and /api/v1
+app.config['REPLICA_DATABASE_URL'] = os.environ.get('REPLICA_DATABASE_URL')
+app.config['REPLICA_PIN_SECONDS'] = int(os.environ.get('REPLICA_PIN_SECONDS', replica.DEFAULT_PIN_SECONDS))
+replica.configure(app)
+
+db = SQLAlchemy(app, session_options={'class_': replica.RoutingSession})
+app.after_request(replica.pin_after_write)
+with app.app_context():
+    db_profiles.track_checkouts(db.engine)
+    metrics.add_gauge_source(functools.partial(db_profiles.pool_gauges, dict(db.engines)))
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 
+app.config['JOB_RESULTS_DIR'] = os.environ.get('JOB_RESULTS_DIR', os.path.join(app.instance_path, 'job_results'))
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', user_cache.DEFAULT_TTL))
+# Each worker writes its counters here and /metrics adds them up; clear it before starting gunicorn
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+# When set, /metrics requires "Authorization: Bearer <token>"
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+metrics.init_app(app)
+# Sampling profiler: admins add ?_profile=1 or an X-Profile header; PROFILE_SAMPLE_RATE profiles a random fraction
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS', profiler.DEFAULT_INTERVAL_MS))
+app.config['PROFILE_KEEP'] = int(os.environ.get('PROFILE_KEEP', profiler.DEFAULT_KEEP))
+profiler.init_app(app)
+# Login/register throttling; memory:// counts per worker, redis://... shares buckets between workers and hosts
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() != 'false'
+app.config['RATELIMIT_STORAGE_URL'] = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
+# Reverse proxies in front of the app that append to X-Forwarded-For (1 on Heroku)
+app.config['RATELIMIT_PROXY_COUNT'] = int(os.environ.get('RATELIMIT_PROXY_COUNT', 0))
+# Attempts per client as "<count>/<second|minute|hour|day>"
+app.config['RATELIMIT_LOGIN_IP'] = os.environ.get('RATELIMIT_LOGIN_IP', ratelimit.DEFAULT_LIMITS['login_ip'])
+app.config['RATELIMIT_LOGIN_USERNAME'] = os.environ.get('RATELIMIT_LOGIN_USERNAME', ratelimit.DEFAULT_LIMITS['login_username'])
+app.config['RATELIMIT_REGISTER_IP'] = os.environ.get('RATELIMIT_REGISTER_IP', ratelimit.DEFAULT_LIMITS['register_ip'])
+ratelimit.init_app(app)
+
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return User.query.get(int(user_id))
+    # Static-like views never read current_user, so don't look the user up at all
+    view = app.view_functions.get(request.endpoint)
+    if request.endpoint == 'static' or getattr(view, 'skip_user_lookup', False):
+        return None
+    return user_cache.get_user(int(user_id), ttl=app.config['USER_CACHE_TTL'])
 
 @app.template_filter('parse_json')
 def parse_json_filter(value):
+    # JSON columns are already decoded; only legacy strings need parsing
+    if isinstance(value, (list, dict)):
+        return value
     try:
         return json.loads(value) if value else []
     except:
@@ -1,10 +1,18 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from models import User
+import ratelimit
+import user_cache
 
 auth = Blueprint('auth', __name__)
 
+def _throttled(template, retry_after):
+    flash(f'Too many attempts. Please try again in {retry_after} seconds.', 'danger')
+    response = make_response(render_template(template), 429)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -13,6 +21,13 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        
+        # Throttle before the password hash check, which is what makes a burst expensive
+        retry_after = ratelimit.hit(('login_ip', ratelimit.client_ip()),
+                                    ('login_username', (username or '').strip().lower()[:100]))
+        if retry_after:
+            return _throttled('auth/login.html', retry_after)
+        
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
@@ -33,6 +48,10 @@ def register():
         email = request.form.get('email')
         password = request.form.get('password')
         
+        retry_after = ratelimit.hit(('register_ip', ratelimit.client_ip()))
+        if retry_after:
+            return _throttled('auth/register.html', retry_after)
+        
         if User.query.filter_by(username=username).first():
             flash('Username already exists', 'danger')
             return redirect(url_for('auth.register'))
@@ -59,7 +78,8 @@ def change_password():
         new_password = request.form.get('new_password')
         confirm_password = request.form.get('confirm_password')
         
-        if not current_user.check_password(current_password):
+        user = User.query.get(current_user.id)
+        if not user.check_password(current_password):
             flash('Current password is incorrect.', 'danger')
             return redirect(url_for('auth.change_password'))
         
@@ -71,8 +91,9 @@ def change_password():
             flash('Password must be at least 6 characters long.', 'danger')
             return redirect(url_for('auth.change_password'))
         
-        current_user.set_password(new_password)
+        user.set_password(new_password)
         db.session.commit()
+        user_cache.invalidate_user(user.id)
         
         flash('Password changed successfully!', 'success')
         return redirect(url_for('auth.login'))
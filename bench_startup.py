@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Measure how long importing the app takes, per module (like python -X importtime).
+Usage: python bench_startup.py [--module main] [--top 25] [--runs 5] [--budget-ms 800] [--templates]
+
+Runs the import in a fresh interpreter so nothing is cached, then prints the
+slowest modules by cumulative import time (median over --runs imports). With --budget-ms the script exits
+non-zero when the total exceeds the budget, so a CI step can catch regressions.
+With --templates it also times loading every template in a fresh process,
+which is what the first request of each worker pays.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def measure_imports(module):
+    env = dict(os.environ)
+    # Creating the engine needs a URL, but nothing connects at import time
+    env.setdefault('DATABASE_URL', 'postgresql://localhost/startup_bench')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nesting is shown by indentation after the '|', so keep the leading spaces
+        timings.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return timings
+
+TEMPLATE_LOAD_SCRIPT = """
+import json, os, time
+from main import app
+root = os.path.join(app.root_path, app.template_folder)
+names = [os.path.relpath(os.path.join(d, f), root).replace(os.sep, '/')
+         for d, _, files in os.walk(root) for f in files]
+start = time.perf_counter()
+for name in names:
+    app.jinja_env.get_template(name)
+print(json.dumps({'templates': len(names), 'ms': (time.perf_counter() - start) * 1000}))
+"""
+
+def measure_templates():
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'postgresql://localhost/startup_bench')
+    result = subprocess.run(
+        [sys.executable, '-c', TEMPLATE_LOAD_SCRIPT],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Loading templates failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Report per-module import time for the app.')
+    parser.add_argument('--module', default='main', help='module to import (default: main)')
+    parser.add_argument('--top', type=int, default=25, help='number of modules to list')
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh imports to take the median of')
+    parser.add_argument('--templates', action='store_true',
+                        help='also time the first load of every template in a fresh process')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='fail if total import time exceeds this many milliseconds')
+    args = parser.parse_args()
+
+    # A single import is noisy, so take the median of each module over several runs
+    runs = [measure_imports(args.module) for _ in range(args.runs)]
+    samples = {}
+    for run in runs:
+        for name, self_us, cumulative_us in run:
+            samples.setdefault(name, []).append((self_us, cumulative_us))
+    timings = [(name, statistics.median(s for s, _ in values), statistics.median(c for _, c in values))
+               for name, values in samples.items()]
+    # Top-level entries (no leading indentation) add up to the whole import
+    total_us = statistics.median(
+        sum(cumulative for name, _, cumulative in run if not name.startswith(' ')) for run in runs
+    )
+
+    print(f"{'cumulative ms':>14} {'self ms':>10}  module")
+    for name, self_us, cumulative_us in sorted(timings, key=lambda t: t[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:10.1f}  {name.strip()}")
+    print(f"\nTotal import time for {args.module}: {total_us / 1000:.1f} ms ({len(timings)} modules)")
+
+    if args.templates:
+        loads = [measure_templates() for _ in range(args.runs)]
+        print(f"First load of {loads[0]['templates']} templates: "
+              f"{statistics.median(load['ms'] for load in loads):.1f} ms")
+
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"Import time exceeds budget of {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Compare vote storage layouts at scale on PostgreSQL.
+Usage: python bench_votes.py [--votes 10000000] [--tools 5000] [--users 200000] [--days 730]
+                             [--layout heap|partitioned|both] [--insert-seconds 10] [--keep]
+
+Loads the same synthetic votes into the current layout (heap table with only
+an id primary key) and the partitioned layout of partition_votes.py, then
+times the queries the app runs: the home page leaderboard, Tool.vote_count,
+a 7-day window and a rollup batch, plus single-row insert throughput.
+
+Everything happens in a scratch schema (bench_votes) of DATABASE_URL, with
+no foreign keys, and is dropped afterwards unless --keep is given. A 10M
+vote run needs a few GB of disk and several minutes.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, text
+import partition_votes
+
+SCHEMA = 'bench_votes'
+LOAD_CHUNK = 1000000
+RUNS = 5
+
+HEAP_SQL = [
+    '''CREATE TABLE tool_vote (
+        id SERIAL PRIMARY KEY,
+        tool_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        previous INTEGER,
+        created_at TIMESTAMP WITHOUT TIME ZONE
+    )''',
+]
+
+def _partitioned_sql():
+    return ['CREATE SEQUENCE tool_vote_id_seq'] + partition_votes.create_table_sql(
+        'tool_vote', 'tool_id', sequence='tool_vote_id_seq'
+    )
+
+# What rollups.refresh_tool_vote_daily reads per batch: the change in standing
+# up and down votes per tool and day
+ROLLUP_BATCH_SQL = '''
+    SELECT tool_id, date(created_at),
+           sum(CASE WHEN coalesce(previous, 0) + value > 0 THEN coalesce(previous, 0) + value ELSE 0 END
+               - CASE WHEN coalesce(previous, 0) > 0 THEN coalesce(previous, 0) ELSE 0 END),
+           sum(CASE WHEN coalesce(previous, 0) + value < 0 THEN -(coalesce(previous, 0) + value) ELSE 0 END
+               - CASE WHEN coalesce(previous, 0) < 0 THEN -coalesce(previous, 0) ELSE 0 END),
+           count(id)
+    FROM tool_vote
+    WHERE id > :low AND id <= :low + 10000
+    GROUP BY tool_id, date(created_at)
+'''
+
+# Queries the app runs against votes, as (label, SQL, parameters factory)
+def queries(args):
+    return [
+        ('index leaderboard', 'SELECT tool_id, sum(value) FROM tool_vote GROUP BY tool_id ORDER BY 2 DESC LIMIT 20',
+         lambda: {}),
+        ('Tool.vote_count', 'SELECT coalesce(sum(value), 0) FROM tool_vote WHERE tool_id = :tool_id',
+         lambda: {'tool_id': random.randint(1, args.tools)}),
+        ('last 7 days by tool', "SELECT tool_id, sum(value) FROM tool_vote "
+                                "WHERE created_at >= (now() AT TIME ZONE 'utc') - interval '7 days' GROUP BY tool_id",
+         lambda: {}),
+        ('rollup batch (10k ids)', ROLLUP_BATCH_SQL,
+         lambda: {'low': random.randint(0, max(0, args.votes - 10000))}),
+    ]
+
+def _timed(connection, sql, params):
+    start = time.perf_counter()
+    connection.execute(text(sql), params).fetchall()
+    return (time.perf_counter() - start) * 1000
+
+def load(engine, args, layout):
+    first = date.today() - timedelta(days=args.days)
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+        connection.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+        for statement in (HEAP_SQL if layout == 'heap' else _partitioned_sql()):
+            connection.execute(text(statement))
+        if layout == 'partitioned':
+            # Qualified, so partitions of a real partitioned tool_vote in public don't count
+            partition_votes.ensure_partitions(connection, f'{SCHEMA}.tool_vote', first)
+
+    # Votes spread evenly over --days; duplicates of the compact key are skipped
+    insert = text(
+        "INSERT INTO tool_vote (tool_id, user_id, value, previous, created_at) "
+        "SELECT 1 + floor(random() * :tools)::int, 1 + floor(random() * :users)::int, "
+        "CASE WHEN random() < 0.8 THEN 1 ELSE -1 END, 0, "
+        "(now() AT TIME ZONE 'utc') - random() * (:days * interval '1 day') "
+        "FROM generate_series(1, :count)"
+        + (" ON CONFLICT DO NOTHING" if layout == 'partitioned' else '')
+    )
+    start = time.perf_counter()
+    loaded = 0
+    while loaded < args.votes:
+        count = min(LOAD_CHUNK, args.votes - loaded)
+        with engine.begin() as connection:
+            connection.execute(insert, {'tools': args.tools, 'users': args.users, 'days': args.days, 'count': count})
+        loaded += count
+        print(f"  {layout}: loaded {loaded} votes", file=sys.stderr)
+    load_seconds = time.perf_counter() - start
+
+    with engine.begin() as connection:
+        connection.execute(text('ANALYZE tool_vote'))
+        size = connection.execute(text("SELECT pg_size_pretty(sum(pg_total_relation_size(c.oid))) FROM pg_class c "
+                                        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                                        "WHERE n.nspname = :schema AND c.relkind IN ('r', 'p')"),
+                                   {'schema': SCHEMA}).scalar()
+    return loaded / load_seconds, size
+
+def measure(engine, args, layout):
+    results = {}
+    results['bulk load (votes/s)'], results['size on disk'] = load(engine, args, layout)
+
+    with engine.connect() as connection:
+        for label, sql, params in queries(args):
+            connection.execute(text(sql), params()).fetchall()  # warm the cache
+            results[f'{label} (ms)'] = statistics.median(_timed(connection, sql, params()) for _ in range(RUNS))
+
+    # App-style writes: one vote per transaction
+    insert = text("INSERT INTO tool_vote (tool_id, user_id, value, previous, created_at) "
+                  "VALUES (:tool_id, :user_id, 1, 0, now() AT TIME ZONE 'utc')")
+    inserted = 0
+    deadline = time.perf_counter() + args.insert_seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        with engine.begin() as connection:
+            connection.execute(insert, {'tool_id': random.randint(1, args.tools),
+                                        'user_id': args.users + 1 + inserted})
+        inserted += 1
+    results['single inserts (votes/s)'] = inserted / (time.perf_counter() - start)
+    return results
+
+def _format(value):
+    if isinstance(value, float):
+        return f'{value:,.1f}'
+    return str(value)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark heap vs partitioned vote storage.')
+    parser.add_argument('--votes', type=int, default=10000000)
+    parser.add_argument('--tools', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--days', type=int, default=730, help='spread votes over this many past days')
+    parser.add_argument('--layout', choices=['heap', 'partitioned', 'both'], default='both')
+    parser.add_argument('--insert-seconds', type=float, default=10)
+    parser.add_argument('--keep', action='store_true', help='leave the last layout in the bench_votes schema')
+    args = parser.parse_args()
+
+    url = os.environ.get('DATABASE_URL', '')
+    if not url.startswith('postgres'):
+        print("Set DATABASE_URL to a PostgreSQL database.")
+        sys.exit(1)
+    engine = create_engine(url.replace('postgres://', 'postgresql://', 1))
+
+    @event.listens_for(engine, 'connect')
+    def use_schema(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET search_path TO {SCHEMA}, public')
+        cursor.close()
+
+    layouts = ['heap', 'partitioned'] if args.layout == 'both' else [args.layout]
+    results = {}
+    try:
+        for layout in layouts:
+            results[layout] = measure(engine, args, layout)
+    finally:
+        if not args.keep:
+            with engine.begin() as connection:
+                connection.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+
+    print(f"{args.votes:,} votes, {args.tools:,} tools, {args.users:,} users over {args.days} days")
+    width = max(len(label) for label in results[layouts[0]])
+    print(f"{'':<{width}}  " + '  '.join(f'{layout:>14}' for layout in layouts))
+    for label in results[layouts[0]]:
+        print(f"{label:<{width}}  " + '  '.join(f'{_format(results[layout][label]):>14}' for layout in layouts))
@@ -1,8 +1,12 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app import db
-from models import BlogPost
-import bleach
+from models import BlogPost, User
+from sqlalchemy.orm import joinedload, load_only
+from replica import read_replica
+from user_cache import skip_user_lookup
+import feeds
+import slugs
 
 blog = Blueprint('blog', __name__)
 
@@ -16,12 +20,36 @@ ALLOWED_ATTRIBUTES = {
     '*': ['class']
 }
 
+def clean_html(value):
+    # bleach pulls in html5lib, which is slow to import; load it on first use
+    import bleach
+    return bleach.clean(value or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+
+BLOG_PER_PAGE = 10
+
 @blog.route('/blog')
-def index():
-    posts = BlogPost.query.filter_by(published=True).order_by(BlogPost.created_at.desc()).all()
-    return render_template('admin/blog/index.html', posts=posts)
+@blog.route('/blog/page/<int:page>')
+@read_replica
+def index(page=1):
+    pagination = BlogPost.query\
+        .filter_by(published=True)\
+        .options(
+            load_only(BlogPost.id, BlogPost.title, BlogPost.slug, BlogPost.created_at, BlogPost.user_id,
+                      BlogPost.featured_image, BlogPost.preview, BlogPost.reading_minutes),
+            joinedload(BlogPost.author).load_only(User.username)
+        )\
+        .order_by(BlogPost.created_at.desc(), BlogPost.id.desc())\
+        .paginate(page=page, per_page=BLOG_PER_PAGE, error_out=False)
+    return render_template('admin/blog/index.html', posts=pagination.items, pagination=pagination)
+
+@blog.route('/blog/feed.<any(rss, atom):format>')
+@skip_user_lookup
+@read_replica
+def feed(format):
+    return feeds.blog_feed_response(format)
 
 @blog.route('/blog/<slug>')
+@read_replica
 def post(slug):
     post = BlogPost.query.filter_by(slug=slug).first_or_404()
     if not post.published and not (current_user.is_authenticated and current_user.is_admin):
@@ -48,7 +76,7 @@ def create_blog_post():
     
     if request.method == 'POST':
         title = request.form.get('title')
-        content = bleach.clean(request.form.get('content') or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+        content = clean_html(request.form.get('content'))
         excerpt = request.form.get('excerpt')
         featured_image = request.form.get('featured_image')
         published = bool(request.form.get('published'))
@@ -63,11 +91,11 @@ def create_blog_post():
         post.excerpt = excerpt
         post.featured_image = featured_image
         post.published = published
+        post.update_preview()
         post.user_id = current_user.id
-        post.slug = post.generate_slug()
         
         try:
-            db.session.add(post)
+            slugs.assign_slug(post, title, fallback='post')
             db.session.commit()
             flash('Blog post created successfully!', 'success')
             return redirect(url_for('blog.blog_posts'))
@@ -89,7 +117,7 @@ def edit_post(post_id):
     
     if request.method == 'POST':
         title = request.form.get('title')
-        content = bleach.clean(request.form.get('content') or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+        content = clean_html(request.form.get('content'))
         excerpt = request.form.get('excerpt')
         featured_image = request.form.get('featured_image')
         published = bool(request.form.get('published'))
@@ -99,13 +127,13 @@ def edit_post(post_id):
             return redirect(url_for('blog.edit_post', post_id=post_id))
         
         try:
+            # The slug is kept on edit so published links keep working
             post.title = title
-            if title != post.title:
-                post.slug = post.generate_slug()
             post.content = content
             post.excerpt = excerpt
             post.featured_image = featured_image
             post.published = published
+            post.update_preview()
             
             db.session.commit()
             flash('Blog post updated successfully!', 'success')
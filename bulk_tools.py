@@ -0,0 +1,84 @@
+from app import db
+from models import Category, Tool, Comment, ToolVote, ToolVoteDaily, CommentVote, tool_categories
+from sqlalchemy import Select, delete, func, insert, update, select, true
+
+def _execute(statement, params=None):
+    # Bulk statements never need to reconcile with objects already in the session
+    return db.session.execute(statement, params, execution_options={'synchronize_session': False})
+
+# tool_ids below is a list of ids or a SELECT of tool ids, e.g. a filtered
+# moderation queue, which the statements embed as a subquery
+
+def _count(tool_ids):
+    if isinstance(tool_ids, Select):
+        return db.session.scalar(select(func.count()).select_from(tool_ids.subquery()))
+    return len(tool_ids)
+
+def approve(tool_ids):
+    """Approve every tool in tool_ids with a single UPDATE; returns the row count."""
+    return _execute(update(Tool).where(Tool.id.in_(tool_ids)).values(is_approved=True)).rowcount
+
+def recategorize(tool_ids, category_ids):
+    """Replace the categories of every tool in tool_ids; returns the number of tools.
+
+    The new links are added before the old ones are removed, so a SELECT
+    that filters on a category matches the same tools in both statements.
+    """
+    count = _count(tool_ids)
+    linked = select(tool_categories).where(tool_categories.c.tool_id == Tool.id,
+                                           tool_categories.c.category_id == Category.id).exists()
+    _execute(insert(tool_categories).from_select(
+        ['tool_id', 'category_id'],
+        # Every tool with every new category
+        select(Tool.id, Category.id).join(Category, true())
+        .where(Tool.id.in_(tool_ids), Category.id.in_(category_ids), ~linked)
+    ))
+    _execute(delete(tool_categories).where(tool_categories.c.tool_id.in_(tool_ids),
+                                           tool_categories.c.category_id.notin_(category_ids)))
+    return count
+
+def _chunks(tool_ids, chunk_size):
+    if isinstance(tool_ids, Select):
+        # Re-run each time: tools already deleted no longer match
+        while True:
+            chunk = db.session.execute(tool_ids.limit(chunk_size)).scalars().all()
+            if not chunk:
+                return
+            yield chunk
+    else:
+        tool_ids = list(tool_ids)
+        for start in range(0, len(tool_ids), chunk_size):
+            yield tool_ids[start:start + chunk_size]
+
+DELETE_CHUNK_SIZE = 500
+
+def delete_tools(tool_ids, chunk_size=DELETE_CHUNK_SIZE, progress=None, commit=True):
+    """Delete tools and their dependent rows set-wise, in chunks.
+
+    Query.delete() skips the ORM cascades on Tool.comments and Tool.votes, so
+    comment votes, comments, tool votes, vote rollups and category links are
+    removed first.
+    With commit, each chunk is its own transaction so no single statement
+    holds locks on a huge id list; without it, the caller commits (or rolls
+    back) everything at once. Returns the number of rows deleted from each
+    table.
+    """
+    done = 0
+    counts = {'tools': 0, 'comments': 0, 'comment_votes': 0, 'tool_votes': 0, 'tool_vote_daily': 0, 'tool_categories': 0}
+    
+    for chunk in _chunks(tool_ids, chunk_size):
+        comment_ids = select(Comment.id).where(Comment.tool_id.in_(chunk))
+        counts['comment_votes'] += _execute(delete(CommentVote).where(CommentVote.comment_id.in_(comment_ids))).rowcount
+        counts['comments'] += _execute(delete(Comment).where(Comment.tool_id.in_(chunk))).rowcount
+        counts['tool_votes'] += _execute(delete(ToolVote).where(ToolVote.tool_id.in_(chunk))).rowcount
+        counts['tool_vote_daily'] += _execute(delete(ToolVoteDaily).where(ToolVoteDaily.tool_id.in_(chunk))).rowcount
+        counts['tool_categories'] += _execute(delete(tool_categories).where(tool_categories.c.tool_id.in_(chunk))).rowcount
+        counts['tools'] += _execute(delete(Tool).where(Tool.id.in_(chunk))).rowcount
+        if commit:
+            db.session.commit()
+        
+        done += len(chunk)
+        if progress:
+            progress(done)
+    
+    return counts
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pre-compress static files so workers never compress them per request.
+Usage: python compress_static.py [directory ...] [--min-size 500]
+
+Writes a .gz (and, when the brotli package is installed, a .br) next to
+every compressible file, at maximum compression. The app serves these
+variants to clients that accept them. Defaults to static/; also useful
+on the output of freeze.py. Re-run after changing static files.
+"""
+
+import argparse
+import gzip
+import mimetypes
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import compression
+
+def compress_file(path, min_size):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < min_size:
+        return []
+
+    # mtime=0 keeps the output identical between builds
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if compression.brotli is not None:
+        variants.append(('.br', compression.brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compressed in variants:
+        target = path + suffix
+        if len(compressed) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        with open(target, 'wb') as f:
+            f.write(compressed)
+        written.append((target, len(data), len(compressed)))
+    return written
+
+def compress_directory(directory, min_size=compression.DEFAULT_MIN_SIZE):
+    written = []
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            if mimetypes.guess_type(filename)[0] not in compression.COMPRESSIBLE_MIMETYPES:
+                continue
+            written.extend(compress_file(os.path.join(root, filename), min_size))
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write .gz/.br variants of static files.')
+    parser.add_argument('directories', nargs='*', default=['static'])
+    parser.add_argument('--min-size', type=int, default=compression.DEFAULT_MIN_SIZE,
+                        help='skip files smaller than this many bytes')
+    args = parser.parse_args()
+
+    if compression.brotli is None:
+        print("brotli is not installed; writing .gz files only")
+    for directory in args.directories:
+        for target, size, compressed in compress_directory(directory, args.min_size):
+            print(f"{target}: {size} -> {compressed} bytes")
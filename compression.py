@@ -0,0 +1,137 @@
+import gzip
+import mimetypes
+import os
+import zlib
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # gzip only; pip install brotli to enable br
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/atom+xml', 'image/svg+xml'
+}
+# Below this many bytes the headers cost more than compression saves
+DEFAULT_MIN_SIZE = 500
+# Pre-compressed variants of static files, in order of preference
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def _negotiate(encodings):
+    accepted = request.accept_encodings
+    best = accepted.best_match(encodings)
+    return best if best and accepted[best] else None
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+def _compress_chunks(chunks, stream, flush_each):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = stream.compress(chunk)
+            # Streamed pages flush every chunk so the browser can render progressively
+            if flush_each:
+                data += stream.flush()
+            if data:
+                yield data
+        yield stream.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(app, response):
+    config = app.config
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    # Static files are pre-compressed at build time (see compress_static.py)
+    if response.direct_passthrough and request.endpoint == 'static':
+        return response
+
+    # Files and buffered bodies know their size up front; generators don't
+    if response.content_length is not None and response.content_length < config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = _negotiate(available_encodings())
+    if encoding is None:
+        return response
+
+    if response.direct_passthrough or response.is_streamed:
+        stream = _BrotliStream(config['COMPRESS_BR_QUALITY']) if encoding == 'br' else _GzipStream(config['COMPRESS_LEVEL'])
+        flush_each = not response.direct_passthrough
+        response.direct_passthrough = False
+        response.response = _compress_chunks(response.response, stream, flush_each)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if encoding == 'br':
+            response.set_data(brotli.compress(data, quality=config['COMPRESS_BR_QUALITY']))
+        else:
+            response.set_data(gzip.compress(data, compresslevel=config['COMPRESS_LEVEL']))
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
+
+def serve_static(app, filename):
+    """Send static/<filename>, or its .br/.gz sibling when the client accepts it."""
+    static_folder = app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    max_age = app.get_send_file_max_age(filename)
+    if mimetype in COMPRESSIBLE_MIMETYPES:
+        path = safe_join(static_folder, filename)
+        available = [encoding for encoding, suffix in STATIC_ENCODINGS
+                     if path and os.path.isfile(path + suffix)]
+        encoding = _negotiate(available) if available else None
+        if encoding:
+            suffix = dict(STATIC_ENCODINGS)[encoding]
+            response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype, max_age=max_age)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(static_folder, filename, max_age=max_age)
+        if available:
+            response.vary.add('Accept-Encoding')
+        return response
+    return send_from_directory(static_folder, filename, max_age=max_age)
+
+def init_app(app):
+    if not app.config['COMPRESS_ENABLED']:
+        return
+    app.after_request(lambda response: compress_response(app, response))
+    app.view_functions['static'] = lambda filename: serve_static(app, filename)
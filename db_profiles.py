@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+PROFILES = ('gunicorn', 'serverless', 'pgbouncer', 'sqlite')
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout takes to get a connection.
+
+    That is the wait for a free slot plus, when the pool grows, the connect itself.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.wait_max_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self.wait_lock:
+                self.wait_count += 1
+                self.wait_seconds += waited
+                self.wait_max_seconds = max(self.wait_max_seconds, waited)
+
+def detect_profile(database_url):
+    """Pick a profile from the environment when DB_PROFILE isn't set."""
+    if database_url and database_url.startswith('sqlite'):
+        return 'sqlite'
+    if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        # Netlify functions run on Lambda
+        return 'serverless'
+    return 'gunicorn'
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+def _env_flag(name, default):
+    return os.environ.get(name, 'true' if default else 'false').lower() == 'true'
+
+def _postgres_connect_args(database_url, profile):
+    url = make_url(database_url) if database_url else None
+    connect_args = {}
+    if url is None:
+        return connect_args
+    if 'sslmode' not in url.query:
+        connect_args['sslmode'] = os.environ.get('DB_SSLMODE', 'require')
+    if profile == 'pgbouncer' and url.drivername == 'postgresql+psycopg':
+        # psycopg 3 prepares repeated statements server-side, which breaks when
+        # PgBouncer hands the next transaction to a different server connection.
+        # psycopg2 never uses server-side prepared statements.
+        connect_args['prepare_threshold'] = None
+    return connect_args
+
+def engine_options(database_url, profile=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for one of PROFILES.
+
+    gunicorn:   long-lived workers; a LIFO queue pool sized by DB_POOL_SIZE /
+                DB_MAX_OVERFLOW, recycled instead of pinged on every checkout.
+    serverless: NullPool (each invocation opens its own connection), or a tiny
+                pinged pool when DB_POOL_SIZE > 0 so warm containers reuse one.
+    pgbouncer:  transaction pooling in front of Postgres; small pool, no
+                prepared statements, no pings since PgBouncer owns server links.
+    sqlite:     tests and local development; Flask-SQLAlchemy's own defaults.
+    """
+    profile = profile or detect_profile(database_url)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}")
+
+    if profile == 'sqlite':
+        return {}
+
+    options = {'connect_args': _postgres_connect_args(database_url, profile)}
+
+    if profile == 'gunicorn':
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_size': _env_int('DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 300),
+            'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', False),
+            # Reusing the most recent connection lets idle ones age out server-side
+            'pool_use_lifo': True
+        })
+    elif profile == 'serverless':
+        pool_size = _env_int('DB_POOL_SIZE', 0)
+        if pool_size:
+            options.update({
+                'poolclass': TimedQueuePool,
+                'pool_size': pool_size,
+                'max_overflow': 0,
+                'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+                'pool_recycle': _env_int('DB_POOL_RECYCLE', 60),
+                # A frozen container's connection may have been dropped meanwhile
+                'pool_pre_ping': True
+            })
+        else:
+            options['poolclass'] = NullPool
+    elif profile == 'pgbouncer':
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_size': _env_int('DB_POOL_SIZE', 2),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 5),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 600),
+            'pool_pre_ping': False
+        })
+
+    return options
+
+def pool_metrics(engine):
+    """Snapshot of an engine's pool: sizing, connections in use and checkout waits."""
+    pool = engine.pool
+    metrics = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow
+        })
+    else:
+        stats = _checkout_counts.get(engine, {'checked_out': 0})
+        metrics['checked_out'] = stats['checked_out']
+    if isinstance(pool, TimedQueuePool):
+        with pool.wait_lock:
+            metrics.update({
+                'checkouts': pool.wait_count,
+                'wait_seconds_total': round(pool.wait_seconds, 6),
+                'wait_seconds_max': round(pool.wait_max_seconds, 6)
+            })
+    return metrics
+
+_checkout_counts = {}
+
+def track_checkouts(engine):
+    """Count checked-out connections for pools without their own bookkeeping (NullPool)."""
+    if isinstance(engine.pool, QueuePool):
+        return
+    stats = _checkout_counts.setdefault(engine, {'checked_out': 0})
+    lock = threading.Lock()
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with lock:
+            stats['checked_out'] += 1
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        with lock:
+            stats['checked_out'] -= 1
+
+def pool_gauges(engines):
+    """Pool state of each bind as (name, labels, value) rows for the metrics endpoint."""
+    rows = []
+    for bind, engine in engines.items():
+        stats = pool_metrics(engine)
+        bind = bind or 'default'
+        for state in ('checked_out', 'checked_in', 'overflow', 'size'):
+            if state in stats:
+                rows.append(('db_pool_connections', {'bind': bind, 'state': state}, stats[state]))
+        if 'wait_seconds_total' in stats:
+            rows.append(('db_pool_wait_seconds_total', {'bind': bind}, stats['wait_seconds_total']))
+    return rows
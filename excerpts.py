@@ -0,0 +1,22 @@
+import html
+import re
+
+PREVIEW_LENGTH = 300
+# Tool cards in list views
+SUMMARY_LENGTH = 160
+WORDS_PER_MINUTE = 200
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+def plain_text(markup):
+    """Text of an HTML fragment with tags dropped and whitespace collapsed."""
+    return ' '.join(html.unescape(_TAG_RE.sub(' ', markup or '')).split())
+
+def make_preview(text, length=PREVIEW_LENGTH):
+    """Cut text at a word boundary to at most length characters."""
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
+
+def reading_minutes(text):
+    return max(1, round(len(text.split()) / WORDS_PER_MINUTE))
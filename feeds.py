@@ -0,0 +1,237 @@
+import hashlib
+from email.utils import format_datetime
+from datetime import timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+from flask import Response, abort, request, stream_with_context, url_for
+from sqlalchemy import func
+from werkzeug.http import is_resource_modified
+from app import db
+from models import BlogPost, Category, Tool
+import compression
+import excerpts
+
+SITE_NAME = 'AI Tools Directory'
+# Sitemap protocol limit per file; past it /sitemap.xml becomes a sitemap index
+SITEMAP_LIMIT = 50000
+FEED_LIMIT = 50
+# Rows per round trip of the server-side cursor, and per streamed chunk
+BATCH_SIZE = 1000
+MAX_AGE = 3600
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+FEED_MIMETYPES = {'rss': 'application/rss+xml', 'atom': 'application/atom+xml'}
+
+def _url_prefix(endpoint):
+    # One url_for per sitemap instead of one per row
+    return url_for(endpoint, slug='-', _external=True)[:-1]
+
+def _w3c_date(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _rfc822_date(value):
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+def _streamed_rows(query):
+    """Iterate a query through a server-side cursor, BATCH_SIZE rows at a time."""
+    return query.yield_per(BATCH_SIZE)
+
+def _chunked(lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+# Conditional GET. Validators come from an aggregate query per resource, so a
+# client that is up to date costs one cheap query and no XML.
+
+def _validators(parts, dates):
+    etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    dates = [date for date in dates if date is not None]
+    return etag, max(dates) if dates else None
+
+def _matching_etag(etag, last_modified):
+    """The validator a fresh client holds, or None if the body must be sent."""
+    if_none_match = request.if_none_match
+    if if_none_match:
+        # compress_response suffixes the ETag of compressed bodies
+        for candidate in [etag] + [f'{etag}-{encoding}' for encoding in compression.available_encodings()]:
+            if if_none_match.contains_weak(candidate):
+                return candidate
+        return None
+    if last_modified and request.if_modified_since and not is_resource_modified(request.environ, last_modified=last_modified):
+        return etag
+    return None
+
+def _conditional_stream(generate, mimetype, validators):
+    etag, last_modified = validators
+    matched = _matching_etag(etag, last_modified)
+    if matched:
+        response = Response(status=304, mimetype=mimetype)
+        response.set_etag(matched)
+    else:
+        response = Response(stream_with_context(generate()), mimetype=mimetype)
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = MAX_AGE
+    return response
+
+def _tool_stats():
+    return db.session.query(func.count(Tool.id), func.max(Tool.id), func.max(Tool.created_at))\
+        .filter(Tool.is_approved == True).one()
+
+def _post_stats():
+    return db.session.query(func.count(BlogPost.id), func.max(BlogPost.id), func.max(BlogPost.updated_at))\
+        .filter(BlogPost.published == True).one()
+
+# Sitemaps
+
+def _sections(tool_stats, post_stats, category_count):
+    """(url count, rows(offset, limit)) per kind of page, in sitemap order.
+
+    Rows are (loc, lastmod or None). The tool section is ordered by id, so a
+    sitemap page keeps its URLs as new tools are added.
+    """
+    newest_tool, newest_post = tool_stats[2], post_stats[2]
+    home = [(url_for('index', _external=True), newest_tool),
+            (url_for('blog.index', _external=True), newest_post)]
+
+    def rows(query, prefix):
+        def fetch(offset, limit):
+            for slug, lastmod in _streamed_rows(query.offset(offset).limit(limit)):
+                yield prefix + quote(slug), lastmod
+        return fetch
+
+    categories = db.session.query(Category.slug, db.null()).filter(Category.slug.isnot(None)).order_by(Category.id)
+    posts = db.session.query(BlogPost.slug, BlogPost.updated_at).filter(BlogPost.published == True).order_by(BlogPost.id)
+    tools = db.session.query(Tool.slug, Tool.created_at)\
+        .filter(Tool.is_approved == True, Tool.slug.isnot(None)).order_by(Tool.id)
+    return [
+        (len(home), lambda offset, limit: home[offset:offset + limit]),
+        (category_count, rows(categories, _url_prefix('category'))),
+        (post_stats[0], rows(posts, _url_prefix('blog.post'))),
+        (tool_stats[0], rows(tools, _url_prefix('tool'))),
+    ]
+
+def _sitemap_urls(sections, offset, limit):
+    for count, fetch in sections:
+        if limit <= 0:
+            return
+        if offset >= count:
+            offset -= count
+            continue
+        taken = min(count - offset, limit)
+        yield from fetch(offset, taken)
+        offset = 0
+        limit -= taken
+
+def _url_lines(sections, offset):
+    for loc, lastmod in _sitemap_urls(sections, offset, SITEMAP_LIMIT):
+        lastmod = f'<lastmod>{_w3c_date(lastmod)}</lastmod>' if lastmod else ''
+        yield f'<url><loc>{escape(loc)}</loc>{lastmod}</url>\n'
+
+def _urlset(sections, offset):
+    yield XML_HEADER + f'<urlset xmlns="{SITEMAP_NS}">\n'
+    yield from _chunked(_url_lines(sections, offset))
+    yield '</urlset>\n'
+
+def sitemap_response(page=None):
+    """/sitemap.xml, or page n of the sitemap once it outgrows SITEMAP_LIMIT URLs."""
+    tool_stats, post_stats = _tool_stats(), _post_stats()
+    category_count = db.session.query(func.count(Category.id)).scalar()
+    total = 2 + category_count + tool_stats[0] + post_stats[0]
+    pages = max(1, -(-total // SITEMAP_LIMIT))
+    validators = _validators((tuple(tool_stats), tuple(post_stats), category_count), [tool_stats[2], post_stats[2]])
+
+    if page is None and pages > 1:
+        def generate():
+            yield XML_HEADER + f'<sitemapindex xmlns="{SITEMAP_NS}">\n'
+            for n in range(1, pages + 1):
+                loc = escape(url_for('sitemap_page', page=n, _external=True))
+                lastmod = f'<lastmod>{_w3c_date(validators[1])}</lastmod>' if validators[1] else ''
+                yield f'<sitemap><loc>{loc}</loc>{lastmod}</sitemap>\n'
+            yield '</sitemapindex>\n'
+        return _conditional_stream(generate, 'application/xml', validators)
+
+    page = page or 1
+    if page > pages:
+        abort(404)
+    sections = _sections(tool_stats, post_stats, category_count)
+    return _conditional_stream(lambda: _urlset(sections, (page - 1) * SITEMAP_LIMIT), 'application/xml', validators)
+
+# RSS 2.0 and Atom feeds of new tools and blog posts. Entries are
+# (title, link, summary, published, updated).
+
+def _rss(title, link, self_link, entries, updated):
+    yield XML_HEADER + f'<rss version="2.0" xmlns:atom="{ATOM_NS}"><channel>\n'
+    yield (f'<title>{escape(title)}</title><link>{escape(link)}</link>'
+           f'<description>{escape(title)}</description>'
+           f'<atom:link href={quoteattr(self_link)} rel="self" type="application/rss+xml"/>\n')
+    if updated:
+        yield f'<lastBuildDate>{_rfc822_date(updated)}</lastBuildDate>\n'
+    for entry_title, entry_link, summary, published, _ in entries:
+        yield (f'<item><title>{escape(entry_title)}</title><link>{escape(entry_link)}</link>'
+               f'<guid isPermaLink="true">{escape(entry_link)}</guid>'
+               f'<description>{escape(summary or "")}</description>'
+               f'<pubDate>{_rfc822_date(published)}</pubDate></item>\n')
+    yield '</channel></rss>\n'
+
+def _atom(title, link, self_link, entries, updated):
+    yield XML_HEADER + f'<feed xmlns="{ATOM_NS}">\n'
+    yield (f'<title>{escape(title)}</title><id>{escape(self_link)}</id>'
+           f'<link rel="self" href={quoteattr(self_link)}/><link href={quoteattr(link)}/>'
+           f'<author><name>{escape(SITE_NAME)}</name></author>'
+           f'<updated>{_w3c_date(updated) if updated else "1970-01-01T00:00:00Z"}</updated>\n')
+    for entry_title, entry_link, summary, published, entry_updated in entries:
+        yield (f'<entry><title>{escape(entry_title)}</title><id>{escape(entry_link)}</id>'
+               f'<link href={quoteattr(entry_link)}/><published>{_w3c_date(published)}</published>'
+               f'<updated>{_w3c_date(entry_updated or published)}</updated>'
+               f'<summary>{escape(summary or "")}</summary></entry>\n')
+    yield '</feed>\n'
+
+def _feed_response(format, title, link, self_link, entries, validators):
+    render = _atom if format == 'atom' else _rss
+    return _conditional_stream(lambda: render(title, link, self_link, entries(), validators[1]),
+                               FEED_MIMETYPES[format], validators)
+
+def tool_feed_response(format):
+    """Newest approved tools as RSS or Atom."""
+    stats = _tool_stats()
+    prefix = _url_prefix('tool')
+
+    def entries():
+        query = db.session.query(Tool.name, Tool.slug, Tool.description, Tool.created_at)\
+            .filter(Tool.is_approved == True, Tool.slug.isnot(None))\
+            .order_by(Tool.created_at.desc(), Tool.id.desc())\
+            .limit(FEED_LIMIT)
+        for name, slug, description, created_at in _streamed_rows(query):
+            yield name, prefix + quote(slug), excerpts.make_preview(excerpts.plain_text(description)), created_at, None
+
+    return _feed_response(format, f'New tools - {SITE_NAME}', url_for('index', _external=True),
+                          url_for('tool_feed', format=format, _external=True), entries,
+                          _validators(tuple(stats), [stats[2]]))
+
+def blog_feed_response(format):
+    """Newest published blog posts as RSS or Atom."""
+    stats = _post_stats()
+    prefix = _url_prefix('blog.post')
+
+    def entries():
+        query = db.session.query(BlogPost.title, BlogPost.slug, BlogPost.preview, BlogPost.created_at, BlogPost.updated_at)\
+            .filter(BlogPost.published == True)\
+            .order_by(BlogPost.created_at.desc(), BlogPost.id.desc())\
+            .limit(FEED_LIMIT)
+        for title, slug, preview, created_at, updated_at in _streamed_rows(query):
+            yield title, prefix + quote(slug), preview, created_at, updated_at
+
+    return _feed_response(format, f'Blog - {SITE_NAME}', url_for('blog.index', _external=True),
+                          url_for('blog.feed', format=format, _external=True), entries,
+                          _validators(tuple(stats), [stats[2]]))
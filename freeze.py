@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Render the public directory to static files for CDN/edge hosting.
+Usage: python freeze.py [output_dir] [--incremental] [--workers N]
+
+Writes index, category, tool and blog pages as HTML plus JSON shards of
+/api/v1. With --incremental only pages whose underlying rows changed
+since the last snapshot (tracked in freeze-manifest.json) are re-rendered.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+MANIFEST_NAME = 'freeze-manifest.json'
+API_SHARD_SIZE = 500
+
+def _fingerprint(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode('utf-8')).hexdigest()
+
+def output_path(url_path):
+    """Map a URL to the file that serves it, e.g. /tool/chatgpt -> tool/chatgpt/index.html."""
+    path = url_path.strip('/')
+    if path.endswith(('.json', '.css', '.txt', '.xml')):
+        return path
+    return os.path.join(path, 'index.html') if path else 'index.html'
+
+def collect_pages():
+    """Return {url_path: fingerprint} for every public page and API shard.
+
+    Fingerprints are built from cheap column queries, so deciding what to
+    re-render costs far less than rendering it.
+    """
+    from app import db
+    from models import Tool, Category, Comment, ToolVote, BlogPost, AppearanceSettings, tool_categories
+    from blog import BLOG_PER_PAGE
+
+    tool_rows = db.session.query(
+        Tool.id, Tool.slug, Tool.name, Tool.description, Tool.url, Tool.image_url, Tool.youtube_url,
+        db.cast(Tool.resources, db.Text), Tool.created_at
+    ).filter(Tool.is_approved == True).order_by(Tool.id).all()
+
+    categories_by_tool = {}
+    for tool_id, category_id in db.session.query(tool_categories.c.tool_id, tool_categories.c.category_id):
+        categories_by_tool.setdefault(tool_id, []).append(category_id)
+
+    comment_stats = dict(
+        (tool_id, (count, last_id)) for tool_id, count, last_id in
+        db.session.query(Comment.tool_id, db.func.count(Comment.id), db.func.max(Comment.id)).group_by(Comment.tool_id)
+    )
+    vote_totals = dict(db.session.query(ToolVote.tool_id, db.func.sum(ToolVote.value)).group_by(ToolVote.tool_id))
+    category_rows = db.session.query(Category.id, Category.slug, Category.name, Category.description).order_by(Category.id).all()
+    settings = AppearanceSettings.query.first()
+    theme = _fingerprint(settings.last_updated if settings else None)
+
+    pages = {}
+    tool_prints = {}
+    for row in tool_rows:
+        tool_id = row[0]
+        tool_prints[tool_id] = _fingerprint(
+            list(row), sorted(categories_by_tool.get(tool_id, [])),
+            comment_stats.get(tool_id), vote_totals.get(tool_id)
+        )
+        pages[f'/tool/{row[1]}'] = _fingerprint(theme, tool_prints[tool_id])
+        pages[f'/api/v1/tools/{tool_id}.json'] = tool_prints[tool_id]
+
+    all_tools = _fingerprint(sorted(tool_prints.items()))
+    categories = _fingerprint([list(row) for row in category_rows])
+    pages['/'] = _fingerprint(theme, all_tools, categories)
+    pages['/custom.css'] = theme
+    pages['/api/v1/categories.json'] = categories
+
+    tool_ids = sorted(tool_prints)
+    for shard in range(max(1, -(-len(tool_ids) // API_SHARD_SIZE))):
+        shard_ids = tool_ids[shard * API_SHARD_SIZE:(shard + 1) * API_SHARD_SIZE]
+        pages[f'/api/v1/tools/page-{shard + 1}.json'] = _fingerprint(len(tool_ids), [tool_prints[i] for i in shard_ids])
+
+    for category_id, slug, name, description in category_rows:
+        members = sorted(tool_id for tool_id in tool_ids if category_id in categories_by_tool.get(tool_id, []))
+        category_print = _fingerprint(name, description, [tool_prints[tool_id] for tool_id in members])
+        pages[f'/category/{slug}'] = _fingerprint(theme, category_print)
+        pages[f'/api/v1/categories/{category_id}/tools.json'] = category_print
+
+    post_rows = db.session.query(BlogPost.slug, BlogPost.updated_at, BlogPost.created_at)\
+        .filter(BlogPost.published == True)\
+        .order_by(BlogPost.created_at.desc(), BlogPost.id.desc()).all()
+    for slug, updated_at, created_at in post_rows:
+        pages[f'/blog/{slug}'] = _fingerprint(theme, updated_at, created_at)
+    # Same order and page size as blog.index
+    for page in range(max(1, -(-len(post_rows) // BLOG_PER_PAGE))):
+        page_rows = post_rows[page * BLOG_PER_PAGE:(page + 1) * BLOG_PER_PAGE]
+        page_print = _fingerprint(theme, len(post_rows), [list(row) for row in page_rows])
+        pages['/blog' if page == 0 else f'/blog/page/{page + 1}'] = page_print
+
+    return pages
+
+def collect_redirects():
+    """Permanent redirects from the old numeric tool and category URLs."""
+    from app import db
+    from models import Tool, Category
+
+    redirects = []
+    for prefix, model in (('/tool', Tool), ('/category', Category)):
+        rows = db.session.query(model.id, model.slug).filter(model.slug.isnot(None)).order_by(model.id)
+        redirects.extend((f'{prefix}/{id}', f'{prefix}/{slug}') for id, slug in rows)
+    return redirects
+
+def write_redirects(output_dir, redirects):
+    # Netlify-style _redirects file, also understood by Cloudflare Pages
+    with open(os.path.join(output_dir, '_redirects'), 'w', encoding='utf-8') as f:
+        for source, target in redirects:
+            f.write(f'{source} {target} 301\n')
+
+def _api_source(url_path):
+    """The live endpoint (or shard builder) behind a frozen API path."""
+    if url_path == '/api/v1/categories.json':
+        return '/api/v1/categories'
+    if url_path.startswith('/api/v1/tools/page-'):
+        return None
+    return url_path[:-len('.json')]
+
+_client = None
+
+def _init_worker():
+    global _client
+    from main import app
+    _client = app.test_client()
+
+def _render(job):
+    url_path, output_dir = job
+    target = os.path.join(output_dir, output_path(url_path))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    if url_path.startswith('/api/v1/tools/page-'):
+        body = _render_tool_shard(int(url_path.rsplit('-', 1)[1][:-len('.json')]))
+        status = 200
+    else:
+        source = _api_source(url_path) if url_path.startswith('/api/') else url_path
+        response = _client.get(source)
+        status, body = response.status_code, response.get_data()
+
+    if status == 200:
+        with open(target, 'wb') as f:
+            f.write(body)
+    return url_path, status
+
+def _render_tool_shard(shard):
+    from main import app
+    from api import tool_summary
+    import votes
+    from models import Tool, TOOL_LIST_OPTIONS
+
+    with app.app_context():
+        query = Tool.query.filter_by(is_approved=True).options(*TOOL_LIST_OPTIONS).order_by(Tool.id)
+        total = query.count()
+        tools = query.offset((shard - 1) * API_SHARD_SIZE).limit(API_SHARD_SIZE).all()
+        totals = votes.totals(tools=tools)['tool']
+        return json.dumps({
+            'tools': [tool_summary(tool, totals[tool.id]) for tool in tools],
+            'page': shard,
+            'pages': max(1, -(-total // API_SHARD_SIZE))
+        }).encode('utf-8')
+
+def _remove_page(output_dir, url_path):
+    target = os.path.join(output_dir, output_path(url_path))
+    if os.path.exists(target):
+        os.remove(target)
+    # Drop directories the page leaves empty, e.g. tool/<slug>/
+    parent = os.path.dirname(target)
+    while os.path.abspath(parent) != os.path.abspath(output_dir) and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+def clear_snapshot(output_dir):
+    """Delete the pages of the previous snapshot in output_dir, and nothing else.
+
+    Only files listed in its manifest are removed, so pointing a full run at
+    the wrong directory can't wipe it; a non-empty directory without a
+    manifest is refused.
+    """
+    if not os.path.isdir(output_dir):
+        return
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        if os.listdir(output_dir):
+            raise ValueError(f"{output_dir} is not empty and has no {MANIFEST_NAME}; "
+                             f"refusing to render into it. Pick an empty or new directory.")
+        return
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    for url_path in previous:
+        _remove_page(output_dir, url_path)
+    os.remove(manifest_path)
+
+def freeze(output_dir, incremental=False, workers=None):
+    from main import app
+
+    with app.app_context():
+        pages = collect_pages()
+        redirects = collect_redirects()
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    previous = {}
+    if incremental and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    else:
+        clear_snapshot(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    stale = [url_path for url_path, fingerprint in pages.items()
+             if previous.get(url_path) != fingerprint
+             or not os.path.exists(os.path.join(output_dir, output_path(url_path)))]
+
+    # Pages that disappeared (deleted or unapproved tools, unpublished posts)
+    removed = [url_path for url_path in previous if url_path not in pages]
+    for url_path in removed:
+        _remove_page(output_dir, url_path)
+
+    shutil.copytree(os.path.join(app.root_path, 'static'), os.path.join(output_dir, 'static'), dirs_exist_ok=True)
+    write_redirects(output_dir, redirects)
+
+    workers = workers or os.cpu_count() or 1
+    failed = []
+    if stale:
+        # spawn so each worker opens its own database connections
+        with multiprocessing.get_context('spawn').Pool(workers, initializer=_init_worker) as pool:
+            for url_path, status in pool.imap_unordered(_render, [(url_path, output_dir) for url_path in stale], chunksize=8):
+                if status != 200:
+                    failed.append(url_path)
+                    print(f"Failed to render {url_path}: HTTP {status}")
+
+    manifest = {url_path: fingerprint for url_path, fingerprint in pages.items() if url_path not in failed}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"Rendered {len(stale) - len(failed)} of {len(pages)} pages "
+          f"({len(pages) - len(stale)} unchanged, {len(removed)} removed, {len(failed)} failed)")
+    return not failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render the public site to static files.')
+    parser.add_argument('output_dir', nargs='?', default='build/site')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-render pages whose rows changed since the last snapshot')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of render processes (default: CPU count)')
+    args = parser.parse_args()
+
+    try:
+        succeeded = freeze(args.output_dir, incremental=args.incremental, workers=args.workers)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if not succeeded:
+        sys.exit(1)
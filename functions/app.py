@@ -7,58 +7,46 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.join(current_dir, '..')
 sys.path.insert(0, project_root)
 
+# Warm invocations reuse the container, so build the app once and keep it.
+# The database engine only connects when a request first needs it.
+_app = None
+
+def get_app():
+    global _app
+    if _app is None:
+        from main import app
+        _app = app
+    return _app
+
+def _error_response(error, message, **extra):
+    return {
+        'statusCode': 500,
+        'body': json.dumps(dict(error=error, message=message, **extra)),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
+
 def handler(event, context):
     try:
-        print(f"Function called with event: {event}")
-        print(f"Context: {context}")
-        
         # Try to import Flask app
         try:
-            from main import app
+            app = get_app()
             import serverless_wsgi
-            print("Successfully imported Flask app and serverless_wsgi")
         except ImportError as import_error:
             print(f"Import error: {import_error}")
-            return {
-                'statusCode': 500,
-                'body': json.dumps({
-                    'error': 'Failed to import Flask app',
-                    'message': str(import_error),
-                    'sys.path': sys.path,
-                    'current_dir': current_dir,
-                    'project_root': project_root
-                }),
-                'headers': {
-                    'Content-Type': 'application/json'
-                }
-            }
+            return _error_response(
+                'Failed to import Flask app', str(import_error),
+                **{'sys.path': sys.path, 'current_dir': current_dir, 'project_root': project_root}
+            )
         
         # Handle the request
         try:
             return serverless_wsgi.handle_request(app, event, context)
         except Exception as wsgi_error:
             print(f"WSGI error: {wsgi_error}")
-            return {
-                'statusCode': 500,
-                'body': json.dumps({
-                    'error': 'WSGI handling error',
-                    'message': str(wsgi_error)
-                }),
-                'headers': {
-                    'Content-Type': 'application/json'
-                }
-            }
+            return _error_response('WSGI handling error', str(wsgi_error))
         
     except Exception as e:
         print(f"Unexpected error: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'error': 'Unexpected error',
-                'message': str(e),
-                'sys.path': sys.path
-            }),
-            'headers': {
-                'Content-Type': 'application/json'
-            }
-        }
\ No newline at end of file
+        return _error_response('Unexpected error', str(e), **{'sys.path': sys.path})
@@ -15,6 +15,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
     from app import app, db
     from models import Tool, Category, User
+    import slugs
 except ImportError as e:
     print(f"Error importing models: {e}")
     print("Make sure you're running this from the project root directory.")
@@ -25,7 +26,7 @@ def get_or_create_category(name, description=""):
     category = Category.query.filter_by(name=name).first()
     if not category:
         category = Category(name=name, description=description)
-        db.session.add(category)
+        slugs.assign_slug(category, name, fallback='category')
         db.session.commit()
         print(f"Created new category: {name}")
     return category
@@ -125,9 +126,8 @@ def import_tools_from_json(json_file_path):
                 category = get_or_create_category(cat_name)
                 tool_categories.append(category)
             
+            slugs.assign_slug(tool, tool.name, fallback='tool')
             tool.categories = tool_categories
-            
-            db.session.add(tool)
             db.session.commit()
             
             print(f"Imported tool: {tool.name}")
@@ -155,7 +155,7 @@ def print_sample_json():
                 "image_url": "https://example.com/logo.png",
                 "youtube_url": "https://youtube.com/watch?v=example",
                 "categories": ["AI Writing", "AI Productivity"],
-                "resources": "Additional information about the tool",
+                "resources": [{"title": "Documentation", "url": "https://example.com/docs"}],
                 "is_approved": True
             }
         ]
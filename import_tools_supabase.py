@@ -9,6 +9,8 @@ import sys
 import os
 from datetime import datetime
 from supabase import create_client, Client
+import youtube
+from resources import normalize_resources
 
 def get_supabase_client():
     """Create and return a Supabase client."""
@@ -117,7 +119,8 @@ def import_tools_from_json(json_file_path: str):
                 'url': tool_data.get('url', tool_data.get('website', '')),
                 'image_url': tool_data.get('image_url', tool_data.get('logo', tool_data.get('icon', ''))),
                 'youtube_url': tool_data.get('youtube_url', tool_data.get('video', '')),
-                'resources': json.dumps(tool_data.get('resources', [])) if isinstance(tool_data.get('resources', []), list) else str(tool_data.get('resources', '')),
+                'youtube_video_id': youtube.extract_video_id(tool_data.get('youtube_url', tool_data.get('video', ''))),
+                'resources': normalize_resources(tool_data.get('resources', [])),
                 'is_approved': tool_data.get('is_approved', True),
                 'user_id': admin_user['id']
             }
@@ -190,7 +193,7 @@ def print_sample_json():
                 "image_url": "https://example.com/logo.png",
                 "youtube_url": "https://youtube.com/watch?v=example",
                 "categories": ["AI Writing", "AI Productivity"],
-                "resources": "Additional information about the tool",
+                "resources": [{"title": "Documentation", "url": "https://example.com/docs"}],
                 "is_approved": True
             }
         ]
@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.orm.attributes import set_committed_value
+from app import app, db
+from models import Job
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    thread_name_prefix='job'
+)
+
+# Jobs queued or running in this process get their heartbeat_at touched this
+# often; a job whose heartbeat is older than STALE_SECONDS lost its worker
+HEARTBEAT_SECONDS = 30
+STALE_SECONDS = 180
+STALE_MESSAGE = 'The worker running this job stopped before it finished. Start it again.'
+
+_active = set()
+_active_lock = threading.Lock()
+_heartbeat = None
+
+def _beat():
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        with _active_lock:
+            job_ids = list(_active)
+        if not job_ids:
+            continue
+        try:
+            with app.app_context(), db.engine.begin() as connection:
+                connection.execute(Job.__table__.update()
+                                   .where(Job.__table__.c.id.in_(job_ids))
+                                   .values(heartbeat_at=datetime.utcnow()))
+        except Exception:
+            logger.exception('Job heartbeat failed')
+
+def _start_heartbeat():
+    global _heartbeat
+    with _active_lock:
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_beat, name='job-heartbeat', daemon=True)
+            _heartbeat.start()
+
+def fail_stale_jobs():
+    """Mark queued or running jobs whose worker went away as failed.
+
+    Jobs run on threads of the web worker that accepted them, so a recycled
+    or killed worker (or a serverless invocation that ended) leaves its jobs
+    unfinished with no heartbeat. Returns the number of jobs marked.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+    last_seen = db.func.coalesce(Job.heartbeat_at, Job.started_at, Job.created_at)
+    count = Job.query.filter(Job.status.in_(('queued', 'running')), last_seen < cutoff)\
+        .update({'status': 'failed', 'message': STALE_MESSAGE, 'finished_at': datetime.utcnow()},
+                synchronize_session=False)
+    db.session.commit()
+    return count
+
+def submit(kind, func, *args, user_id=None, **kwargs):
+    """Record a job and run func(job, *args, **kwargs) on a worker thread.
+
+    The job function runs inside its own app context and may call
+    update_progress(); its return value becomes the job's message.
+    """
+    fail_stale_jobs()
+    job = Job(kind=kind, user_id=user_id, heartbeat_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+
+    _start_heartbeat()
+    with _active_lock:
+        _active.add(job.id)
+    _executor.submit(_run, job.id, func, args, kwargs)
+    return job
+
+def update_progress(job, progress, total=None, message=None):
+    """Record progress on a connection of its own.
+
+    The job's session is left alone, so work it hasn't committed yet stays
+    uncommitted and the job can still succeed or fail as a whole.
+    """
+    values = {'progress': progress}
+    if total is not None:
+        values['total'] = total
+    if message is not None:
+        values['message'] = message
+    with db.engine.begin() as connection:
+        connection.execute(Job.__table__.update().where(Job.__table__.c.id == job.id).values(**values))
+    for key, value in values.items():
+        set_committed_value(job, key, value)
+
+def result_file(job, filename):
+    """Open a file for the job's downloadable result and record it on the job.
+
+    Results live on local disk, so every worker on the host can serve them.
+    """
+    results_dir = app.config['JOB_RESULTS_DIR']
+    os.makedirs(results_dir, exist_ok=True)
+    job.result_path = os.path.join(results_dir, f'{job.id}-{filename}')
+    job.result_filename = filename
+    db.session.commit()
+    return open(job.result_path, 'w', encoding='utf-8')
+
+def _run(job_id, func, args, kwargs):
+    try:
+        _run_job(job_id, func, args, kwargs)
+    finally:
+        with _active_lock:
+            _active.discard(job_id)
+
+def _run_job(job_id, func, args, kwargs):
+    with app.app_context():
+        job = Job.query.get(job_id)
+        job.status = 'running'
+        job.started_at = job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+        try:
+            message = func(job, *args, **kwargs)
+            job.status = 'finished'
+            if message is not None:
+                job.message = message
+        except Exception as e:
+            logger.exception('Job %s (%s) failed', job_id, job.kind)
+            db.session.rollback()
+            job = Job.query.get(job_id)
+            job.status = 'failed'
+            job.message = str(e)
+            job.result_path = None
+
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
@@ -0,0 +1,213 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+# Seconds; roughly Prometheus client defaults, trimmed for a web app
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# How often a worker writes its counters to the shared directory
+DUMP_INTERVAL = 1.0
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'db_queries_total': ('counter', 'SQL statements executed, by endpoint.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent executing SQL, by endpoint.'),
+    'cache_requests_total': ('counter', 'Cache lookups by cache and result (hit or miss).'),
+    'ratelimit_rejections_total': ('counter', 'Attempts rejected by a rate limit, by limit.'),
+    'ratelimit_errors_total': ('counter', 'Rate limit checks let through because the store failed, by limit.'),
+    'db_pool_connections': ('gauge', 'Connection pool state per worker.'),
+    'db_pool_wait_seconds_total': ('counter', 'Time checkouts spent waiting for a connection, per worker.'),
+    'app_worker_info': ('gauge', 'One series per live worker process.'),
+    'app_workers': ('gauge', 'Number of live worker processes writing metrics.'),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_started = time.time()
+_last_dump = 0.0
+_local = threading.local()
+_metrics_dir = None
+_gauge_sources = []
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            # One slot per bucket (the last is +Inf), then sum and count
+            histogram = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 3)
+        histogram[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+def add_gauge_source(func):
+    """Register func() -> [(name, labels, value)], sampled whenever this worker dumps."""
+    _gauge_sources.append(func)
+
+def current_endpoint():
+    """Endpoint of the request being served on this thread ('background' for jobs)."""
+    return getattr(_local, 'endpoint', None) or 'background'
+
+# Request and query hooks
+
+def _before_request():
+    from flask import request
+    _local.endpoint = request.endpoint or 'unmatched'
+    _local.start = time.perf_counter()
+
+def _after_request(response):
+    from flask import request
+    start = getattr(_local, 'start', None)
+    if start is not None:
+        endpoint = _local.endpoint
+        observe('http_request_duration_seconds', time.perf_counter() - start, endpoint=endpoint)
+        inc('http_requests_total', endpoint=endpoint, method=request.method, status=str(response.status_code))
+        _local.start = None
+    maybe_dump()
+    return response
+
+def _teardown_request(exc):
+    _local.endpoint = None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+    endpoint = current_endpoint()
+    inc('db_queries_total', endpoint=endpoint)
+    inc('db_query_duration_seconds_total', elapsed, endpoint=endpoint)
+
+def init_app(app):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    global _metrics_dir
+    _metrics_dir = app.config['METRICS_DIR']
+    os.makedirs(_metrics_dir, exist_ok=True)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    # Listening on the Engine class covers the primary and any replica bind
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+# Sharing between gunicorn workers: each process periodically writes its own
+# snapshot to METRICS_DIR and /metrics sums the snapshots of every process.
+
+def _snapshot_path():
+    return os.path.join(_metrics_dir, f'{os.getpid()}-{int(_started * 1000)}.json')
+
+def dump():
+    global _last_dump
+    if _metrics_dir is None:
+        return
+    with _lock:
+        counters = [[name, list(labels), value] for (name, labels), value in _counters.items()]
+        histograms = [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()]
+    gauges = []
+    for source in _gauge_sources:
+        try:
+            gauges.extend([name, sorted(labels.items()), value] for name, labels, value in source())
+        except Exception:
+            pass
+    snapshot = {'pid': os.getpid(), 'ppid': os.getppid(), 'started': _started,
+                'counters': counters, 'histograms': histograms, 'gauges': gauges}
+    path = _snapshot_path()
+    with open(path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(path + '.tmp', path)
+    _last_dump = time.monotonic()
+
+def maybe_dump():
+    if time.monotonic() - _last_dump >= DUMP_INTERVAL:
+        dump()
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _load_snapshots():
+    snapshots = []
+    for path in glob.glob(os.path.join(_metrics_dir, '*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Another worker is mid-write; its previous numbers are already counted
+            continue
+    return snapshots
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+    return '{' + pairs + '}'
+
+def render():
+    """Prometheus text exposition of every worker's counters plus live gauges."""
+    dump()
+    counters = {}
+    histograms = {}
+    gauges = {}
+    live = {}
+    for snapshot in _load_snapshots():
+        # Counters of exited workers still count, so totals never go backwards
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+            else:
+                histograms[key] = list(values)
+        # Gauges only describe processes that are still running; if a pid was
+        # reused, the newest snapshot wins
+        pid = snapshot['pid']
+        if _pid_alive(pid) and snapshot['started'] >= live.get(pid, {}).get('started', 0):
+            live[pid] = snapshot
+
+    for pid, snapshot in live.items():
+        worker = (('pid', str(pid)),)
+        gauges[('app_worker_info', worker + (('ppid', str(snapshot['ppid'])), ('started', str(int(snapshot['started'])))))] = 1
+        for name, labels, value in snapshot['gauges']:
+            gauges[(name, worker + tuple(map(tuple, labels)))] = value
+    gauges[('app_workers', ())] = len(live)
+
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        series = [(key, value) for source in (counters, gauges) for key, value in source.items() if key[0] == metric]
+        buckets = [(key, values) for key, values in histograms.items() if key[0] == metric]
+        if not series and not buckets:
+            continue
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for (name, labels), value in sorted(series):
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), values in sorted(buckets):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-2]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {values[-1]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,53 @@
+from app import app, db
+from models import BlogPost
+from sqlalchemy import text
+
+BATCH_SIZE = 100
+
+def migrate_blog_preview():
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        existing_columns = [col['name'] for col in inspector.get_columns('blog_post')]
+
+        try:
+            if 'preview' not in existing_columns:
+                db.session.execute(text('ALTER TABLE blog_post ADD COLUMN preview TEXT'))
+            if 'reading_minutes' not in existing_columns:
+                db.session.execute(text('ALTER TABLE blog_post ADD COLUMN reading_minutes INTEGER'))
+            db.session.commit()
+
+            # Backfill posts saved before the preview was precomputed, in id order
+            updated = 0
+            last_id = 0
+            while True:
+                rows = db.session.query(BlogPost.id, BlogPost.content, BlogPost.excerpt)\
+                    .filter(BlogPost.id > last_id)\
+                    .filter(BlogPost.reading_minutes.is_(None))\
+                    .order_by(BlogPost.id)\
+                    .limit(BATCH_SIZE)\
+                    .all()
+                if not rows:
+                    break
+
+                params = []
+                for post_id, content, excerpt in rows:
+                    preview, reading_minutes = BlogPost.compute_preview(content, excerpt)
+                    params.append({'preview': preview, 'reading_minutes': reading_minutes, 'id': post_id})
+                # Plain UPDATE so backfilling doesn't bump updated_at
+                db.session.execute(
+                    text('UPDATE blog_post SET preview = :preview, reading_minutes = :reading_minutes WHERE id = :id'),
+                    params
+                )
+                db.session.commit()
+                updated += len(rows)
+                last_id = rows[-1][0]
+
+            print(f"Migration completed successfully! Backfilled {updated} blog posts.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_blog_preview()
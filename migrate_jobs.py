@@ -0,0 +1,30 @@
+from app import app, db
+from models import Job
+from sqlalchemy import text
+
+def migrate_jobs():
+    with app.app_context():
+        try:
+            Job.__table__.create(db.engine, checkfirst=True)
+
+            # Columns added after the job table was first created
+            inspector = db.inspect(db.engine)
+            existing_columns = [col['name'] for col in inspector.get_columns('job')]
+            new_columns = {
+                'result_path': 'VARCHAR(500)',
+                'result_filename': 'VARCHAR(200)',
+                'heartbeat_at': 'TIMESTAMP'
+            }
+            for column_name, column_type in new_columns.items():
+                if column_name not in existing_columns:
+                    db.session.execute(text(f'ALTER TABLE job ADD COLUMN {column_name} {column_type}'))
+            db.session.commit()
+
+            print("Job table migrated successfully!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_jobs()
@@ -0,0 +1,34 @@
+from app import app, db
+from sqlalchemy import text
+
+# (table, index name); slug allocation looks up "base-%" prefixes on these
+SLUG_COLUMNS = [
+    ('blog_post', 'ix_blog_post_slug_pattern'),
+    ('tool', 'ix_tool_slug_pattern'),
+    ('category', 'ix_category_slug_pattern'),
+]
+
+def migrate_slug_indexes():
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            # SQLite's LIKE prefix matching already uses the unique index
+            print("Not PostgreSQL; no slug pattern indexes needed.")
+            return
+
+        try:
+            for table, index_name in SLUG_COLUMNS:
+                # The unique index uses the database collation, which can't serve
+                # LIKE 'prefix%' unless the collation is C
+                db.session.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} (slug text_pattern_ops)'
+                ))
+            db.session.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_slug_indexes()
@@ -0,0 +1,62 @@
+from app import app, db
+from sqlalchemy import text
+from resources import normalize_resources
+import json
+
+BATCH_SIZE = 500
+
+def migrate_tool_resources():
+    with app.app_context():
+        is_postgres = db.engine.dialect.name == 'postgresql'
+        inspector = db.inspect(db.engine)
+        resources_column = next(col for col in inspector.get_columns('tool') if col['name'] == 'resources')
+        already_jsonb = is_postgres and resources_column['type'].__class__.__name__ == 'JSONB'
+
+        if already_jsonb:
+            update_sql = text('UPDATE tool SET resources = CAST(:resources AS JSONB) WHERE id = :id')
+        else:
+            update_sql = text('UPDATE tool SET resources = :resources WHERE id = :id')
+
+        try:
+            # Rewrite every value as the canonical JSON list while the column is still text,
+            # so the type change below can't fail on raw strings left by older importers
+            normalized = 0
+            last_id = 0
+            while True:
+                rows = db.session.execute(
+                    text('SELECT id, CAST(resources AS TEXT) FROM tool WHERE id > :last_id ORDER BY id LIMIT :limit'),
+                    {'last_id': last_id, 'limit': BATCH_SIZE}
+                ).fetchall()
+                if not rows:
+                    break
+
+                for tool_id, raw in rows:
+                    canonical = normalize_resources(raw)
+                    if raw is not None and _decode(raw) == canonical:
+                        continue
+                    db.session.execute(update_sql, {'resources': json.dumps(canonical), 'id': tool_id})
+                    normalized += 1
+                db.session.commit()
+                last_id = rows[-1][0]
+
+            if is_postgres and not already_jsonb:
+                db.session.execute(text(
+                    'ALTER TABLE tool ALTER COLUMN resources TYPE JSONB USING resources::jsonb'
+                ))
+                db.session.commit()
+
+            print(f"Migration completed successfully! Normalized {normalized} tools.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+def _decode(raw):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+if __name__ == '__main__':
+    migrate_tool_resources()
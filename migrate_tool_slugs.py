@@ -0,0 +1,62 @@
+from app import app, db
+from models import Tool, Category
+from sqlalchemy import text
+import slugs
+
+BATCH_SIZE = 500
+
+# (model, fallback for names that slugify to nothing)
+SLUGGED_MODELS = [
+    (Category, 'category'),
+    (Tool, 'tool'),
+]
+
+def migrate_tool_slugs():
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+
+        try:
+            for model, fallback in SLUGGED_MODELS:
+                table = model.__tablename__
+                existing_columns = [col['name'] for col in inspector.get_columns(table)]
+                if 'slug' not in existing_columns:
+                    db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN slug VARCHAR(200)'))
+                    db.session.commit()
+
+                # Backfill in id order, so duplicate names number up from the oldest row
+                allocator = slugs.SlugAllocator(model.slug)
+                updated = 0
+                last_id = 0
+                while True:
+                    rows = db.session.query(model.id, model.name)\
+                        .filter(model.id > last_id)\
+                        .filter(model.slug.is_(None))\
+                        .order_by(model.id)\
+                        .limit(BATCH_SIZE)\
+                        .all()
+                    if not rows:
+                        break
+
+                    params = [{'slug': allocator.allocate(name, fallback), 'id': row_id} for row_id, name in rows]
+                    db.session.execute(text(f'UPDATE {table} SET slug = :slug WHERE id = :id'), params)
+                    db.session.commit()
+                    updated += len(rows)
+                    last_id = rows[-1][0]
+
+                db.session.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_slug ON {table} (slug)'))
+                # Pages link by slug, so a row without one can't be linked to.
+                # SQLite can't add NOT NULL to an existing column; there the backfill has to do
+                if db.engine.dialect.name == 'postgresql':
+                    db.session.execute(text(f'ALTER TABLE {table} ALTER COLUMN slug SET NOT NULL'))
+                db.session.commit()
+                print(f"Backfilled {updated} {table} slugs.")
+
+            print("Migration completed successfully! Run migrate_slug_indexes.py on PostgreSQL.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_tool_slugs()
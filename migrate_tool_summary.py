@@ -0,0 +1,46 @@
+from app import app, db
+from models import Tool
+from sqlalchemy import text
+
+BATCH_SIZE = 100
+
+def migrate_tool_summary():
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        existing_columns = [col['name'] for col in inspector.get_columns('tool')]
+
+        try:
+            if 'summary' not in existing_columns:
+                db.session.execute(text('ALTER TABLE tool ADD COLUMN summary TEXT'))
+            db.session.commit()
+
+            # Backfill tools saved before the summary was precomputed, in id order
+            updated = 0
+            last_id = 0
+            while True:
+                rows = db.session.query(Tool.id, Tool.description)\
+                    .filter(Tool.id > last_id)\
+                    .filter(Tool.summary.is_(None))\
+                    .order_by(Tool.id)\
+                    .limit(BATCH_SIZE)\
+                    .all()
+                if not rows:
+                    break
+
+                db.session.execute(
+                    text('UPDATE tool SET summary = :summary WHERE id = :id'),
+                    [{'summary': Tool.compute_summary(description), 'id': tool_id} for tool_id, description in rows]
+                )
+                db.session.commit()
+                updated += len(rows)
+                last_id = rows[-1][0]
+
+            print(f"Migration completed successfully! Backfilled {updated} tool summaries.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_tool_summary()
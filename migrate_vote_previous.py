@@ -0,0 +1,41 @@
+from app import app, db
+from sqlalchemy import text
+
+# table -> column of the voted-on row
+VOTE_TABLES = {'tool_vote': 'tool_id', 'comment_vote': 'comment_id'}
+
+def migrate_vote_previous():
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+
+        try:
+            for table, key_column in VOTE_TABLES.items():
+                existing_columns = [col['name'] for col in inspector.get_columns(table)]
+                if 'previous' not in existing_columns:
+                    db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN previous INTEGER'))
+
+                # Each row's previous is the running total of the user's earlier rows
+                db.session.execute(text(f'''
+                    WITH running AS (
+                        SELECT id, COALESCE(SUM(value) OVER (
+                            PARTITION BY {key_column}, user_id ORDER BY id
+                            ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                        ), 0) AS previous
+                        FROM {table}
+                    )
+                    UPDATE {table} SET previous = running.previous
+                    FROM running
+                    WHERE running.id = {table}.id AND {table}.previous IS NULL
+                '''))
+                db.session.commit()
+                print(f"{table}: backfilled previous vote totals.")
+
+            print("Migration completed successfully! Run python rollup_votes.py --rebuild to recount tool_vote_daily.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_vote_previous()
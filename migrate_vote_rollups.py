@@ -0,0 +1,20 @@
+from app import app, db
+from models import RollupState, ToolVoteDaily
+import rollups
+
+def migrate_vote_rollups():
+    with app.app_context():
+        try:
+            RollupState.__table__.create(db.engine, checkfirst=True)
+            ToolVoteDaily.__table__.create(db.engine, checkfirst=True)
+
+            # Count the votes cast so far
+            counted = rollups.refresh_tool_vote_daily()
+            print(f"Migration completed successfully! Rolled up {counted} existing votes.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_vote_rollups()
@@ -0,0 +1,51 @@
+from app import app, db
+from models import Tool
+from sqlalchemy import text
+import youtube
+
+BATCH_SIZE = 500
+
+def migrate_youtube_video_id():
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        existing_columns = [col['name'] for col in inspector.get_columns('tool')]
+
+        try:
+            if 'youtube_video_id' not in existing_columns:
+                db.session.execute(text('ALTER TABLE tool ADD COLUMN youtube_video_id VARCHAR(11)'))
+                db.session.commit()
+
+            # Backfill existing rows by parsing youtube_url once, in id order
+            updated = 0
+            last_id = 0
+            while True:
+                rows = db.session.query(Tool.id, Tool.youtube_url)\
+                    .filter(Tool.id > last_id)\
+                    .filter(Tool.youtube_url.isnot(None))\
+                    .filter(Tool.youtube_video_id.is_(None))\
+                    .order_by(Tool.id)\
+                    .limit(BATCH_SIZE)\
+                    .all()
+                if not rows:
+                    break
+
+                for tool_id, youtube_url in rows:
+                    video_id = youtube.extract_video_id(youtube_url)
+                    if video_id:
+                        db.session.execute(
+                            text('UPDATE tool SET youtube_video_id = :video_id WHERE id = :id'),
+                            {'video_id': video_id, 'id': tool_id}
+                        )
+                        updated += 1
+                db.session.commit()
+                last_id = rows[-1][0]
+
+            print(f"Migration completed successfully! Backfilled {updated} tools.")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during migration: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_youtube_video_id()
@@ -2,9 +2,12 @@ from datetime import datetime
 from app import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import defer, relationship, validates
 from sqlalchemy import text
-import re
+from sqlalchemy.dialects.postgresql import JSONB
+import excerpts
+import youtube
+from resources import normalize_resources
 
 # Association table for Tool-Category many-to-many relationship
 tool_categories = db.Table('tool_categories',
@@ -32,15 +35,21 @@ class User(UserMixin, db.Model):
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    # Stable across re-imports, unlike id; see slugs.assign_slug
+    slug = db.Column(db.String(200), unique=True, nullable=False)
     description = db.Column(db.Text)
 
 class Tool(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
+    slug = db.Column(db.String(200), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=False)
+    # Plain-text start of description, set with it, so list views never load description
+    summary = db.Column(db.Text)
     url = db.Column(db.String(500), nullable=False)
     image_url = db.Column(db.String(500))
     youtube_url = db.Column(db.String(500))
+    youtube_video_id = db.Column(db.String(11))  # Parsed from youtube_url on write
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     comments = db.relationship('Comment', backref='tool', lazy=True, cascade='all, delete-orphan')
@@ -48,29 +57,38 @@ class Tool(db.Model):
     is_approved = db.Column(db.Boolean, default=False)
     categories = db.relationship('Category', secondary=tool_categories, lazy='subquery',
                                 backref=db.backref('tools', lazy=True))
-    resources = db.Column(db.Text)  # Store as JSON string of resource entries
+    # List of {'title', 'url'} dicts; decoded once when the row is loaded
+    resources = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))
 
     @property
     def vote_count(self):
         return db.session.query(db.func.coalesce(db.func.sum(ToolVote.value), text('0'))).filter(ToolVote.tool_id == self.id).scalar() or 0
     
+    @staticmethod
+    def compute_summary(description):
+        return excerpts.make_preview(excerpts.plain_text(description), excerpts.SUMMARY_LENGTH)
+
+    @validates('description')
+    def _set_summary(self, key, description):
+        self.summary = Tool.compute_summary(description)
+        return description
+
+    @validates('youtube_url')
+    def _set_youtube_video_id(self, key, youtube_url):
+        self.youtube_video_id = youtube.extract_video_id(youtube_url)
+        return youtube_url
+
+    @validates('resources')
+    def _normalize_resources(self, key, resources):
+        return normalize_resources(resources)
+
     @property
     def youtube_embed_url(self):
-        if not self.youtube_url:
-            return None
-        
-        youtube_regex = (
-            r'(?:https?:\/\/)?'
-            r'(?:www\.)?'
-            r'(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|'
-            r'youtu\.be\/)([a-zA-Z0-9_-]{11})'
-        )
-        
-        match = re.search(youtube_regex, self.youtube_url)
-        if match:
-            video_id = match.group(1)
-            return f'https://www.youtube.com/embed/{video_id}'
-        return None
+        return youtube.embed_url(self.youtube_video_id)
+
+    @property
+    def youtube_thumbnail_url(self):
+        return youtube.thumbnail_url(self.youtube_video_id)
 
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -95,32 +113,88 @@ class BlogPost(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     featured_image = db.Column(db.String(500))
     excerpt = db.Column(db.Text)
+    # Precomputed on save so the blog index never loads content
+    preview = db.Column(db.Text)
+    reading_minutes = db.Column(db.Integer)
+
+    @staticmethod
+    def compute_preview(content, excerpt):
+        """(preview, reading_minutes) for a post's content and optional hand-written excerpt."""
+        text = excerpts.plain_text(content)
+        return (excerpt or '').strip() or excerpts.make_preview(text), excerpts.reading_minutes(text)
 
-    def generate_slug(self):
-        base_slug = re.sub(r'[^\w\s-]', '', self.title.lower())
-        base_slug = re.sub(r'[-\s]+', '-', base_slug).strip('-')
-        slug = base_slug
-        counter = 1
-        
-        while BlogPost.query.filter_by(slug=slug).first() is not None:
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-            
-        return slug
+    def update_preview(self):
+        self.preview, self.reading_minutes = BlogPost.compute_preview(self.content, self.excerpt)
 
 class ToolVote(db.Model):
+    # Insert-only: rollups.py counts new ids, and partition_votes.py may partition the table by created_at
     id = db.Column(db.Integer, primary_key=True)
     tool_id = db.Column(db.Integer, db.ForeignKey('tool.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    value = db.Column(db.Integer, nullable=False)  # 1 for upvote, -1 for downvote
+    value = db.Column(db.Integer, nullable=False)  # change to the user's vote, see votes.cast
+    # The user's vote total before this row, so rollups can tell a new vote from a
+    # withdrawn or flipped one; NULL on rows cast before it was stored (read as 0)
+    previous = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class ToolVoteDaily(db.Model):
+    """Votes per tool per UTC day, rolled up from ToolVote by rollups.py."""
+    __tablename__ = 'tool_vote_daily'
+    tool_id = db.Column(db.Integer, db.ForeignKey('tool.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    upvotes = db.Column(db.Integer, nullable=False, default=0)
+    downvotes = db.Column(db.Integer, nullable=False, default=0)
+    # Leaderboards read a range of days across all tools
+    __table_args__ = (db.Index('ix_tool_vote_daily_day', 'day', 'tool_id'),)
+
+class RollupState(db.Model):
+    """High-water mark of each rollup: the last source row id it has counted."""
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
 class CommentVote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     comment_id = db.Column(db.Integer, db.ForeignKey('comment.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    value = db.Column(db.Integer, nullable=False)  # 1 for upvote, -1 for downvote
+    value = db.Column(db.Integer, nullable=False)  # change to the user's vote, see votes.cast
+    # The user's vote total before this row, so rollups can tell a new vote from a
+    # withdrawn or flipped one; NULL on rows cast before it was stored (read as 0)
+    previous = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, finished, failed
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer, default=0)
+    message = db.Column(db.Text)
+    result_path = db.Column(db.String(500))  # Downloadable artifact written by the job, if any
+    result_filename = db.Column(db.String(200))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Touched while a worker holds the job; see jobs.fail_stale_jobs
+    heartbeat_at = db.Column(db.DateTime)
+
+    @property
+    def is_done(self):
+        return self.status in ('finished', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress or 0,
+            'total': self.total or 0,
+            'message': self.message,
+            'has_result': bool(self.result_path),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
 
 class AppearanceSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -168,3 +242,7 @@ class AppearanceSettings(db.Model):
             db.session.add(settings)
             db.session.commit()
         return settings
+
+# Loader options for queries that list tools: description and resources load only if accessed.
+# Down here because building them configures the mappers, which needs every model defined
+TOOL_LIST_OPTIONS = (defer(Tool.description), defer(Tool.resources))
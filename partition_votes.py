@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Move tool_vote and comment_vote to monthly range partitions (PostgreSQL only).
+Usage: python partition_votes.py [--batch-size 50000] [--months-ahead 3]
+       python partition_votes.py --maintain
+
+The partitioned layout is keyed by (tool_id or comment_id, user_id,
+created_at) with the vote value stored in the key index, so a tool's
+total is an index-only scan, and time-windowed queries only read the
+partitions they cover. Ids keep coming from the original sequence, so
+rollup high-water marks stay valid.
+
+Existing votes are copied in id batches while the site keeps running.
+Only the final step locks the table against writes, to copy any rows not
+copied yet, check that counts and vote totals match, and swap the tables.
+A vote that would collide with another on the key stops the migration
+instead of being dropped. The old table is kept as <table>_unpartitioned
+until you drop it.
+
+Run with --maintain monthly (or more often) to create upcoming
+partitions. Votes outside every partition land in a default partition,
+which then blocks creating the partition for their month.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+BATCH_SIZE = 50000
+MONTHS_AHEAD = 3
+
+# table -> (parent key column, parent table)
+VOTE_TABLES = {
+    'tool_vote': ('tool_id', 'tool'),
+    'comment_vote': ('comment_id', 'comment'),
+}
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def create_table_sql(name, key_column, parent_table=None, prefix=None, sequence=None):
+    """DDL of a partitioned vote table; foreign keys are skipped without parent_table."""
+    prefix = prefix or name
+    references = parent_table is not None
+    return [
+        f'''CREATE TABLE {name} (
+            id INTEGER NOT NULL{f" DEFAULT nextval('{sequence}')" if sequence else ''},
+            {key_column} INTEGER NOT NULL{f' REFERENCES {parent_table} (id)' if references else ''},
+            user_id INTEGER NOT NULL{' REFERENCES "user" (id)' if references else ''},
+            value SMALLINT NOT NULL,
+            previous SMALLINT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            CONSTRAINT {prefix}_vote_key PRIMARY KEY ({key_column}, user_id, created_at) INCLUDE (value)
+        ) PARTITION BY RANGE (created_at)''',
+        # Rollups read id ranges; user deletes check the user_id foreign key
+        f'CREATE INDEX ix_{prefix}_id ON {name} (id)',
+        f'CREATE INDEX ix_{prefix}_user_id ON {name} (user_id)',
+        f'CREATE TABLE {prefix}_pdefault PARTITION OF {name} DEFAULT',
+    ]
+
+def ensure_partitions(connection, name, first_month, months_ahead=MONTHS_AHEAD, prefix=None):
+    """Create the monthly partitions from first_month to months_ahead past this month."""
+    prefix = prefix or name
+    month = date(first_month.year, first_month.month, 1)
+    last = _add_months(date.today(), months_ahead)
+    created = 0
+    while month <= last:
+        following = _add_months(month, 1)
+        partition = f'{prefix}_p{month:%Y_%m}'
+        exists = connection.execute(text('SELECT to_regclass(:name)'), {'name': partition}).scalar()
+        if not exists:
+            connection.execute(text(
+                f"CREATE TABLE {partition} PARTITION OF {name} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            ))
+            created += 1
+        month = following
+    return created
+
+def is_partitioned(connection, name):
+    return connection.execute(text(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+        'WHERE c.relname = :name)'
+    ), {'name': name}).scalar()
+
+def _copy_sql(source, target, key_column, condition):
+    # created_at is part of the key, so rows without one get a distinct stand-in
+    # derived from their id, early in the first partition
+    return (f"INSERT INTO {target} (id, {key_column}, user_id, value, previous, created_at) "
+            f"SELECT id, {key_column}, user_id, value, previous, "
+            f"COALESCE(created_at, CAST(:base AS TIMESTAMP) + id * interval '1 microsecond') "
+            f"FROM {source} WHERE {condition}")
+
+def _totals(connection, name):
+    return tuple(connection.execute(text(f'SELECT count(*), coalesce(sum(value), 0) FROM {name}')).one())
+
+def partition_table(engine, table, batch_size=BATCH_SIZE, months_ahead=MONTHS_AHEAD):
+    key_column, parent_table = VOTE_TABLES[table]
+    staging = f'{table}_partitioned'
+    sequence = f'{table}_id_seq'
+
+    with engine.begin() as connection:
+        if is_partitioned(connection, table):
+            print(f"{table} is already partitioned.")
+            return
+        first = connection.execute(text(f'SELECT min(created_at) FROM {table}')).scalar() or date.today()
+        high = connection.execute(text(f'SELECT coalesce(max(id), 0) FROM {table}')).scalar()
+        if not connection.execute(text('SELECT to_regclass(:name)'), {'name': staging}).scalar():
+            for statement in create_table_sql(staging, key_column, parent_table, prefix=table, sequence=sequence):
+                connection.execute(text(statement))
+        ensure_partitions(connection, staging, first, months_ahead, prefix=table)
+    base = date(first.year, first.month, 1)
+
+    # Bulk of the rows, one transaction per batch, while votes keep coming in.
+    # Re-running after an interruption resumes from what was already copied.
+    with engine.connect() as connection:
+        low = connection.execute(text(f'SELECT coalesce(max(id), 0) FROM {staging}')).scalar()
+    copy = text(_copy_sql(table, staging, key_column, 'id > :low AND id <= :high'))
+    while low < high:
+        upper = min(low + batch_size, high)
+        with engine.begin() as connection:
+            connection.execute(copy, {'base': base, 'low': low, 'high': upper})
+        low = upper
+        print(f"{table}: copied ids up to {upper} of {high}")
+
+    # A vote can take its id before a batch is copied and commit after it, so
+    # rather than copying ids above the last batch, copy every row not copied
+    # yet: once without the lock to catch up, then again with writes blocked
+    missing = text(_copy_sql(table, staging, key_column,
+                             f'NOT EXISTS (SELECT 1 FROM {staging} copied WHERE copied.id = {table}.id)'))
+    with engine.begin() as connection:
+        connection.execute(missing, {'base': base})
+
+    with engine.begin() as connection:
+        connection.execute(text(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE'))
+        connection.execute(missing, {'base': base})
+        source, copied = _totals(connection, table), _totals(connection, staging)
+        if source != copied:
+            # Rolls back; the staging table is kept for a re-run
+            raise RuntimeError(f'{table}: {staging} has {copied[0]} votes summing to {copied[1]}, '
+                               f'but {table} has {source[0]} summing to {source[1]}')
+        connection.execute(text(f'ALTER TABLE {table} RENAME TO {table}_unpartitioned'))
+        connection.execute(text(f'ALTER TABLE {staging} RENAME TO {table}'))
+        # Otherwise dropping the old table would drop the sequence with it
+        connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id'))
+        connection.execute(text(f'ANALYZE {table}'))
+    print(f"{table} partitioned; the old table is {table}_unpartitioned.")
+
+def maintain(engine, months_ahead=MONTHS_AHEAD):
+    with engine.begin() as connection:
+        for table in VOTE_TABLES:
+            if is_partitioned(connection, table):
+                created = ensure_partitions(connection, table, date.today(), months_ahead)
+                print(f"{table}: created {created} partitions.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Range-partition the vote tables by month.')
+    parser.add_argument('--maintain', action='store_true',
+                        help='only create partitions for the coming months')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='vote ids copied per transaction (default: %(default)s)')
+    parser.add_argument('--months-ahead', type=int, default=MONTHS_AHEAD,
+                        help='months of empty partitions to keep ready (default: %(default)s)')
+    args = parser.parse_args()
+
+    from app import app, db
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("Vote partitioning needs PostgreSQL.")
+            sys.exit(1)
+        if args.maintain:
+            maintain(db.engine, args.months_ahead)
+        else:
+            for table in VOTE_TABLES:
+                partition_table(db.engine, table, args.batch_size, args.months_ahead)
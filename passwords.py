@@ -0,0 +1,16 @@
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash
+import multiprocessing
+import os
+
+def hash_pool(workers=None):
+    """Process pool for werkzeug's deliberately slow password hashing.
+
+    Uses the spawn start method so children don't inherit the parent's
+    threads, locks or database connections.
+    """
+    workers = workers or int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+def hash_passwords(pool, passwords, chunksize=16):
+    return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
@@ -0,0 +1,171 @@
+import collections
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Sampling every 5ms costs the profiled request a few percent and nothing for the rest
+DEFAULT_INTERVAL_MS = 5
+# Oldest profiles are removed beyond this many
+DEFAULT_KEEP = 200
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+$')
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+class Sampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed stacks."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name='profile-sampler')
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+def _short_path(filename):
+    if filename.startswith(PROJECT_ROOT):
+        return os.path.relpath(filename, PROJECT_ROOT)
+    if 'site-packages' in filename:
+        return filename.split('site-packages' + os.sep, 1)[-1]
+    return os.path.basename(filename)
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'.replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+# Request hooks
+
+def _wants_profile(app):
+    from flask import request
+    if request.endpoint in (None, 'static'):
+        return False
+    if random.random() < app.config['PROFILE_SAMPLE_RATE']:
+        return True
+    if request.headers.get('X-Profile') or request.args.get('_profile'):
+        from flask_login import current_user
+        return current_user.is_authenticated and current_user.is_admin
+    return False
+
+def init_app(app):
+    from flask import g, request
+
+    @app.before_request
+    def start_profile():
+        if _wants_profile(app):
+            sampler = Sampler(threading.get_ident(), app.config['PROFILE_INTERVAL_MS'] / 1000.0)
+            g.profile = (sampler, time.time(), time.perf_counter())
+            sampler.start()
+
+    @app.after_request
+    def note_status(response):
+        if 'profile' in g:
+            g.profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_profile(exc):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        sampler, started, start = profile
+        sampler.stop()
+        meta = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': g.pop('profile_status', 500),
+            'started': started,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+            'interval_ms': app.config['PROFILE_INTERVAL_MS'],
+            'samples': sum(sampler.stacks.values())
+        }
+        save(app.config['PROFILE_DIR'], meta, sampler.stacks, keep=app.config['PROFILE_KEEP'])
+
+# Storage: <name>.folded holds the collapsed stacks (flamegraph.pl, speedscope,
+# inferno), <name>.json the request it came from.
+
+def save(directory, meta, stacks, keep=DEFAULT_KEEP):
+    os.makedirs(directory, exist_ok=True)
+    name = '{}-{}-{}-{}'.format(
+        time.strftime('%Y%m%d%H%M%S', time.gmtime(meta['started'])),
+        meta['endpoint'], os.getpid(), threading.get_ident() % 100000
+    )
+    with open(os.path.join(directory, name + '.folded'), 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    with open(os.path.join(directory, name + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    for old in list_profiles(directory)[keep:]:
+        for ext in ('.folded', '.json'):
+            try:
+                os.remove(os.path.join(directory, old['name'] + ext))
+            except OSError:
+                pass
+    return name
+
+def list_profiles(directory):
+    """Metadata of every saved profile, newest first."""
+    profiles = []
+    if not os.path.isdir(directory):
+        return profiles
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta['name'] = filename[:-len('.json')]
+        meta['captured'] = datetime.utcfromtimestamp(meta['started'])
+        profiles.append(meta)
+    profiles.sort(key=lambda meta: meta['started'], reverse=True)
+    return profiles
+
+def profile_path(directory, name):
+    """Path of a profile's collapsed stacks, or None if the name isn't a saved profile."""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = os.path.join(directory, name + '.folded')
+    return path if os.path.exists(path) else None
+
+def load_meta(path):
+    """The request metadata saved next to a profile's .folded file, or {} if it's missing or unreadable."""
+    try:
+        with open(path[:-len('.folded')] + '.json', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def summarize(path, limit=30):
+    """(self, total) sample counts of the hottest frames in a collapsed stack file."""
+    own = collections.Counter()
+    total = collections.Counter()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            frames = stack.split(';')
+            count = int(count)
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+    return own.most_common(limit), total.most_common(limit)
@@ -0,0 +1,142 @@
+import math
+import threading
+import time
+import metrics
+
+# "<attempts>/<period>"; each bucket holds that many attempts and refills evenly over the period
+DEFAULT_LIMITS = {
+    'login_ip': '20/minute',
+    'login_username': '5/minute',
+    'register_ip': '5/hour',
+}
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+# Buckets kept per worker before full ones are dropped
+MAX_KEYS = 100000
+
+def parse_limit(value):
+    """'5/minute' -> (capacity, tokens per second)."""
+    count, _, period = value.partition('/')
+    capacity = int(count)
+    seconds = PERIODS[period.strip()] if period.strip() in PERIODS else float(period)
+    return capacity, capacity / seconds
+
+class MemoryStore:
+    """Token buckets held by this worker only.
+
+    Each gunicorn worker counts separately, so the effective limit is the
+    configured one times the number of workers. Use a shared store to limit
+    across workers and hosts.
+    """
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take one token; return 0 if allowed, else seconds until a token is free."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+            else:
+                retry_after = (1 - tokens) / rate
+            # Also note when the bucket is full again, and so no different from no bucket
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        if len(self._buckets) > self.max_keys:
+            # Flooded with distinct keys; forget them rather than grow without bound
+            self._buckets.clear()
+
+class RedisStore:
+    """Token buckets shared by every worker through Redis (pip install redis)."""
+
+    # Refill and take atomically; the bucket expires once it would be full again
+    SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = capacity
+if state[1] then
+    tokens = math.min(capacity, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+        if int(allowed):
+            return 0
+        return (1 - float(tokens)) / rate
+
+def create_store(url):
+    if not url or url.startswith('memory://'):
+        return MemoryStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url)
+    raise ValueError(f'Unsupported RATELIMIT_STORAGE_URL: {url}')
+
+_store = None
+_limits = {}
+_proxy_count = 0
+
+def init_app(app):
+    global _store, _limits, _proxy_count
+    _limits = {name: parse_limit(app.config.get(f'RATELIMIT_{name.upper()}') or default)
+               for name, default in DEFAULT_LIMITS.items()}
+    _proxy_count = app.config['RATELIMIT_PROXY_COUNT']
+    _store = create_store(app.config['RATELIMIT_STORAGE_URL']) if app.config['RATELIMIT_ENABLED'] else None
+
+def client_ip():
+    from flask import request
+    # Behind n proxies, the client is the nth address from the right of X-Forwarded-For
+    if _proxy_count and len(request.access_route) >= _proxy_count:
+        return request.access_route[-_proxy_count]
+    return request.remote_addr or 'unknown'
+
+def hit(*checks):
+    """Take a token from each (limit name, key) bucket in order.
+
+    Returns 0 if every bucket allowed the attempt, else the whole seconds to
+    wait. Stops at the first empty bucket, so an IP that is already throttled
+    doesn't also drain the bucket of the username it is trying. Checks with
+    an empty key are skipped.
+    """
+    if _store is None:
+        return 0
+    for name, key in checks:
+        if not key:
+            continue
+        capacity, rate = _limits[name]
+        try:
+            retry_after = _store.take(f'{name}:{key}', capacity, rate)
+        except Exception:
+            # A shared store that is down shouldn't lock everyone out
+            metrics.inc('ratelimit_errors_total', limit=name)
+            continue
+        if retry_after:
+            metrics.inc('ratelimit_rejections_total', limit=name)
+            return max(1, math.ceil(retry_after))
+    return 0
@@ -0,0 +1,60 @@
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+import db_profiles
+
+BIND_KEY = 'replica'
+# Every /api/v1 endpoint is a read-only GET
+REPLICA_BLUEPRINTS = ('api',)
+# Sessions that wrote read from the primary for this long, covering replication lag
+DEFAULT_PIN_SECONDS = 10
+PIN_SESSION_KEY = '_db_primary_until'
+
+def configure(app):
+    """Add the replica bind when REPLICA_DATABASE_URL is set.
+
+    Must run before SQLAlchemy(app) so Flask-SQLAlchemy creates the engine.
+    """
+    replica_url = app.config.get('REPLICA_DATABASE_URL')
+    if not replica_url:
+        return
+    # Same pooling as the primary, except that a SQLite replica gets the sqlite profile
+    profile = 'sqlite' if replica_url.startswith('sqlite') else app.config['DB_PROFILE']
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds[BIND_KEY] = dict(url=replica_url, **db_profiles.engine_options(replica_url, profile))
+
+def read_replica(view):
+    """Mark a read-only view whose queries may be served by the replica."""
+    view.read_replica = True
+    return view
+
+def _replica_allowed():
+    if not has_request_context() or request.method not in ('GET', 'HEAD'):
+        return False
+    if g.get('db_wrote') or session.get(PIN_SESSION_KEY, 0) > time.time():
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return request.blueprint in REPLICA_BLUEPRINTS or getattr(view, 'read_replica', False)
+
+class RoutingSession(Session):
+    """Session that sends SELECTs from replica-enabled views to the replica bind.
+
+    Flushes and bulk INSERT/UPDATE/DELETE always go to the primary, and
+    once a request has written, the rest of it (and the next few seconds
+    of that user's session, see pin_after_write) read from the primary too.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                if has_request_context():
+                    g.db_wrote = True
+            elif getattr(clause, 'is_select', False) and BIND_KEY in self._db.engines and _replica_allowed():
+                return self._db.engines[BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def pin_after_write(response):
+    # Write-after-read consistency: the user who just wrote sees their write
+    if g.get('db_wrote') and current_app.config.get('REPLICA_DATABASE_URL'):
+        session[PIN_SESSION_KEY] = time.time() + current_app.config['REPLICA_PIN_SECONDS']
+    return response
@@ -0,0 +1,43 @@
+import json
+
+def normalize_resources(value):
+    """Coerce any stored or imported resources value into a list of
+    {'title': ..., 'url': ...} dicts.
+
+    Older rows and importers disagree on the format: some hold json.dumps
+    output, some a raw JSON string, some plain descriptive text.
+    """
+    if value is None:
+        return []
+
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return []
+        try:
+            decoded = json.loads(value)
+        except ValueError:
+            return [_resource_from_text(value)]
+        if isinstance(decoded, str):
+            return normalize_resources(decoded)
+        value = decoded
+
+    if isinstance(value, dict):
+        value = [value]
+    elif not isinstance(value, (list, tuple)):
+        return [_resource_from_text(str(value))]
+
+    normalized = []
+    for item in value:
+        if isinstance(item, dict):
+            url = str(item.get('url') or '').strip()
+            title = str(item.get('title') or item.get('name') or url).strip()
+            if title or url:
+                normalized.append({'title': title, 'url': url})
+        elif isinstance(item, str) and item.strip():
+            normalized.append(_resource_from_text(item.strip()))
+    return normalized
+
+def _resource_from_text(text):
+    url = text if text.startswith(('http://', 'https://')) else ''
+    return {'title': text, 'url': url}
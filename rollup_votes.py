@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Bring the vote rollups up to date with new vote rows.
+Usage: python rollup_votes.py [--rebuild] [--batch-size 10000]
+
+Run it every few minutes from cron (or Heroku Scheduler); each run only
+reads votes added since the previous one. Use --rebuild to recount
+everything after votes were edited or deleted in place.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+import rollups
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Update the tool_vote_daily rollup.')
+    parser.add_argument('--rebuild', action='store_true', help='recount from the first vote')
+    parser.add_argument('--batch-size', type=int, default=rollups.BATCH_SIZE,
+                        help='vote ids per transaction (default: %(default)s)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        refresh = rollups.rebuild_tool_vote_daily if args.rebuild else rollups.refresh_tool_vote_daily
+        counted = refresh(batch_size=args.batch_size)
+    print(f"Rolled up {counted} votes.")
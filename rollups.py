@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import case, func
+from app import db
+from models import RollupState, Tool, ToolVote, ToolVoteDaily
+
+TOOL_VOTE_DAILY = 'tool_vote_daily'
+BATCH_SIZE = 10000
+# Vote rows younger than this wait for the next run, so an id taken by a
+# transaction that hasn't committed yet isn't skipped past
+SETTLE_SECONDS = 60
+# Leaderboard windows in days, ending today (UTC)
+WINDOWS = {'day': 1, 'week': 7, 'month': 30, 'year': 365}
+
+def _insert(table):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f'Vote rollups need PostgreSQL or SQLite, not {dialect}')
+    return insert(table)
+
+def _as_date(value):
+    # SQLite's date() returns text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _locked_state(name):
+    state = db.session.query(RollupState).filter_by(name=name).with_for_update().first()
+    if state is None:
+        state = RollupState(name=name, last_id=0)
+        db.session.add(state)
+        db.session.flush()
+    return state
+
+def _standing_changes():
+    """(upvote change, downvote change) of a vote row.
+
+    A row moves the user's total from previous to previous + value; each
+    side counts how that changed the standing upvotes or downvotes, so a
+    withdrawn upvote is -1 upvote and a flip from up to down is -1 upvote
+    and +1 downvote.
+    """
+    before = func.coalesce(ToolVote.previous, 0)
+    after = before + ToolVote.value
+    upvotes = case((after > 0, after), else_=0) - case((before > 0, before), else_=0)
+    downvotes = case((after < 0, -after), else_=0) - case((before < 0, -before), else_=0)
+    return func.sum(upvotes), func.sum(downvotes)
+
+def refresh_tool_vote_daily(batch_size=BATCH_SIZE, progress=None):
+    """Fold ToolVote rows added since the last run into tool_vote_daily.
+
+    Votes are read in id order from the high-water mark in rollup_state, one
+    batch per transaction. The mark is locked while a batch is counted, so
+    overlapping runs take turns instead of counting a batch twice. The rollup
+    only sees inserts: votes updated or deleted in place need a rebuild.
+    A day's upvotes and downvotes are the change in standing votes cast that
+    day, so they can be negative when earlier votes were withdrawn.
+    Returns the number of vote rows counted.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+    high = db.session.query(func.max(ToolVote.id)).filter(ToolVote.created_at <= cutoff).scalar() or 0
+    table = ToolVoteDaily.__table__
+    counted = 0
+
+    while True:
+        state = _locked_state(TOOL_VOTE_DAILY)
+        low = state.last_id
+        if low >= high:
+            db.session.commit()
+            return counted
+        upper = min(low + batch_size, high)
+
+        rows = db.session.query(
+            ToolVote.tool_id,
+            func.date(ToolVote.created_at),
+            *_standing_changes(),
+            func.count(ToolVote.id)
+        ).filter(ToolVote.id > low, ToolVote.id <= upper)\
+            .group_by(ToolVote.tool_id, func.date(ToolVote.created_at))\
+            .all()
+
+        if rows:
+            statement = _insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.tool_id, table.c.day],
+                set_={'upvotes': table.c.upvotes + statement.excluded.upvotes,
+                      'downvotes': table.c.downvotes + statement.excluded.downvotes}
+            )
+            db.session.execute(statement, [
+                {'tool_id': tool_id, 'day': _as_date(day), 'upvotes': upvotes, 'downvotes': downvotes}
+                for tool_id, day, upvotes, downvotes, _ in rows
+            ])
+        state.last_id = upper
+        state.updated_at = datetime.utcnow()
+        db.session.commit()
+        counted += sum(row[4] for row in rows)
+        if progress:
+            progress(upper, high)
+
+def rebuild_tool_vote_daily(batch_size=BATCH_SIZE, progress=None):
+    """Recount tool_vote_daily from scratch, e.g. after votes were edited in place."""
+    _locked_state(TOOL_VOTE_DAILY).last_id = 0
+    db.session.query(ToolVoteDaily).delete(synchronize_session=False)
+    db.session.commit()
+    return refresh_tool_vote_daily(batch_size, progress)
+
+def status():
+    """(last refresh time, vote rows not rolled up yet)."""
+    state = db.session.get(RollupState, TOOL_VOTE_DAILY)
+    last_id = state.last_id if state else 0
+    # Counts only the index range above the mark
+    pending = db.session.query(func.count(ToolVote.id)).filter(ToolVote.id > last_id).scalar()
+    return (state.updated_at if state else None), pending
+
+# Reads below touch tool_vote_daily (and tool for names) only, never tool_vote
+
+def _window_start(days, today=None):
+    return (today or datetime.utcnow().date()) - timedelta(days=days - 1)
+
+def leaderboard(days, limit=20, category_id=None):
+    """Approved tools with the highest net votes over the last `days` days.
+
+    Returns (id, name, slug, upvotes, downvotes) rows.
+    """
+    totals = db.session.query(
+        ToolVoteDaily.tool_id,
+        func.sum(ToolVoteDaily.upvotes).label('upvotes'),
+        func.sum(ToolVoteDaily.downvotes).label('downvotes')
+    ).filter(ToolVoteDaily.day >= _window_start(days))\
+        .group_by(ToolVoteDaily.tool_id)\
+        .subquery()
+    query = db.session.query(Tool.id, Tool.name, Tool.slug, totals.c.upvotes, totals.c.downvotes)\
+        .join(totals, Tool.id == totals.c.tool_id)\
+        .filter(Tool.is_approved == True)
+    if category_id:
+        query = query.filter(Tool.categories.any(id=category_id))
+    return query.order_by((totals.c.upvotes - totals.c.downvotes).desc(), Tool.id)\
+        .limit(limit)\
+        .all()
+
+def daily_totals(days, tool_id=None):
+    """(day, upvotes, downvotes) for each day with votes in the last `days` days."""
+    query = db.session.query(
+        ToolVoteDaily.day, func.sum(ToolVoteDaily.upvotes), func.sum(ToolVoteDaily.downvotes)
+    ).filter(ToolVoteDaily.day >= _window_start(days))
+    if tool_id is not None:
+        query = query.filter(ToolVoteDaily.tool_id == tool_id)
+    return [(_as_date(day), upvotes, downvotes)
+            for day, upvotes, downvotes in query.group_by(ToolVoteDaily.day).order_by(ToolVoteDaily.day)]
@@ -1,9 +1,15 @@
-from flask import render_template, request, redirect, url_for, jsonify, flash, send_from_directory, send_file, make_response
+from flask import render_template, request, redirect, url_for, jsonify, flash, send_from_directory, send_file, make_response, abort
 from flask_login import current_user, login_required
 from app import app, db
-from models import Category, Tool, Comment, ToolVote, CommentVote, AppearanceSettings, BlogPost
+from models import Category, Tool, Comment, ToolVote, AppearanceSettings, BlogPost, TOOL_LIST_OPTIONS
 from sqlalchemy import desc, func, or_, text
-import bleach
+from user_cache import skip_user_lookup
+from replica import read_replica
+import bulk_tools
+import feeds
+import metrics
+import slugs
+import votes
 import re
 import logging
 import json
@@ -21,11 +27,53 @@ ALLOWED_ATTRIBUTES = {
     '*': ['class']
 }
 
+def clean_html(value):
+    # bleach pulls in html5lib, which is slow to import; load it on first use
+    import bleach
+    return bleach.clean(value or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+
 @app.route('/ads.txt')
+@skip_user_lookup
 def ads_txt():
     return send_from_directory('static', 'ads.txt')
 
+@app.route('/robots.txt')
+@skip_user_lookup
+def robots_txt():
+    response = make_response(f"User-agent: *\nAllow: /\nSitemap: {url_for('sitemap', _external=True)}\n")
+    response.headers['Content-Type'] = 'text/plain; charset=utf-8'
+    return response
+
+@app.route('/sitemap.xml')
+@skip_user_lookup
+@read_replica
+def sitemap():
+    return feeds.sitemap_response()
+
+@app.route('/sitemap-<int:page>.xml')
+@skip_user_lookup
+@read_replica
+def sitemap_page(page):
+    return feeds.sitemap_response(page)
+
+@app.route('/feed.<any(rss, atom):format>')
+@skip_user_lookup
+@read_replica
+def tool_feed(format):
+    return feeds.tool_feed_response(format)
+
+@app.route('/metrics')
+@skip_user_lookup
+def metrics_endpoint():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Access denied'}), 403
+    response = make_response(metrics.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
 @app.route('/custom.css')
+@skip_user_lookup
 def custom_css():
     settings = AppearanceSettings.get_settings()
     css = render_template('css/custom.css', appearance_settings=settings)
@@ -38,13 +86,14 @@ def custom_css():
     return response
 
 @app.route('/')
+@read_replica
 def index():
     try:
         search_query = request.args.get('search', '').strip()
         category_id = request.args.get('category')
         sort_by = request.args.get('sort', 'votes')
         
-        query = Tool.query.filter_by(is_approved=True)
+        query = Tool.query.filter_by(is_approved=True).options(*TOOL_LIST_OPTIONS)
         
         if search_query:
             query = query.filter(
@@ -74,8 +123,10 @@ def index():
         
         tools = query.all()
         categories = Category.query.all()
+        votes.load(tools=tools)
         
-        return render_template('index.html', tools=tools, categories=categories)
+        return render_template('index.html', tools=tools, categories=categories,
+                               vote_totals=votes.totals(tools=tools))
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Database error: {str(e)}")
@@ -89,8 +140,76 @@ def moderate_tools():
         flash('Access denied. Moderator rights required.', 'danger')
         return redirect(url_for('index'))
     
-    tools = Tool.query.filter_by(is_approved=False).order_by(Tool.created_at.desc()).all()
-    return render_template('moderate_tools.html', tools=tools)
+    pagination = _moderation_queue(request.args)\
+        .order_by(Tool.created_at.desc(), Tool.id.desc())\
+        .paginate(page=request.args.get('page', 1, type=int), per_page=MODERATION_PER_PAGE, error_out=False)
+    categories = Category.query.order_by(Category.name).all()
+    return render_template('moderate_tools.html', tools=pagination.items, pagination=pagination, categories=categories)
+
+MODERATION_PER_PAGE = 50
+
+def _moderation_queue(args):
+    query = Tool.query.filter(Tool.is_approved == False).options(*TOOL_LIST_OPTIONS)
+    
+    search = (args.get('q') or '').strip()
+    if search:
+        query = query.filter(Tool.name.ilike(f'%{search}%'))
+    
+    category_id = args.get('category', type=int)
+    if category_id:
+        query = query.filter(Tool.categories.any(Category.id == category_id))
+    
+    return query
+
+@app.route('/moderate-tools/bulk', methods=['POST'])
+@login_required
+def bulk_moderate_tools():
+    if not current_user.is_moderator:
+        flash('Access denied. Moderator rights required.', 'danger')
+        return redirect(url_for('index'))
+    
+    action = request.form.get('action')
+    
+    # Either the ticked rows, or everything in the queue matching the current filter,
+    # passed on as a subquery so the ids are never loaded
+    if request.form.get('apply_to') == 'filter':
+        tool_ids = _moderation_queue(request.form).with_entities(Tool.id).order_by(Tool.id).statement
+        selected = db.session.query(tool_ids.exists()).scalar()
+    else:
+        tool_ids = request.form.getlist('tool_ids', type=int)
+        selected = bool(tool_ids)
+    
+    if not selected:
+        flash('No tools selected.', 'warning')
+        return redirect(url_for('moderate_tools'))
+    
+    try:
+        if action == 'approve':
+            count = bulk_tools.approve(tool_ids)
+            flash(f'{count} tools approved successfully!', 'success')
+        elif action == 'reject':
+            # Committed below with everything else, so a failure rejects nothing
+            count = bulk_tools.delete_tools(tool_ids, commit=False)['tools']
+            flash(f'{count} tools rejected and removed successfully!', 'success')
+        elif action == 'recategorize':
+            category_ids = [category_id for (category_id,) in db.session.query(Category.id)
+                            .filter(Category.id.in_(request.form.getlist('category_ids', type=int)))]
+            if not category_ids:
+                flash('Please select at least one valid category', 'danger')
+                return redirect(url_for('moderate_tools'))
+            count = bulk_tools.recategorize(tool_ids, category_ids)
+            flash(f'{count} tools recategorized successfully!', 'success')
+        else:
+            flash('Unknown moderation action.', 'danger')
+            return redirect(url_for('moderate_tools'))
+        
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error moderating tools: {str(e)}', 'danger')
+    
+    return redirect(url_for('moderate_tools', q=request.form.get('q') or None,
+                            category=request.form.get('category') or None))
 
 @app.route('/moderate-tool/<int:tool_id>/<action>')
 @login_required
@@ -116,9 +235,23 @@ def moderate_tool(tool_id, action):
     
     return redirect(url_for('moderate_tools'))
 
+# Numeric URLs from before slugs; old ids are answered from memory
+TOOL_SLUGS = slugs.SlugMap(Tool)
+CATEGORY_SLUGS = slugs.SlugMap(Category)
+
 @app.route('/tool/<int:tool_id>')
-def tool(tool_id):
-    tool = Tool.query.get_or_404(tool_id)
+@skip_user_lookup
+def tool_by_id(tool_id):
+    slug = TOOL_SLUGS.get(tool_id)
+    if slug is None:
+        abort(404)
+    return redirect(url_for('tool', slug=slug), code=301)
+
+@app.route('/tool/<slug>')
+@read_replica
+def tool(slug):
+    tool = Tool.query.filter_by(slug=slug).first_or_404()
+    tool_id = tool.id
     if not tool.is_approved and not (current_user.is_authenticated and (current_user.is_moderator or current_user.id == tool.user_id)):
         flash('This tool is not yet approved.', 'warning')
         return redirect(url_for('index'))
@@ -127,7 +260,7 @@ def tool(tool_id):
                            .order_by(desc(Comment.created_at))\
                            .all()
     
-    similar_tools = Tool.query.join(Tool.categories)\
+    similar_tools = Tool.query.options(*TOOL_LIST_OPTIONS).join(Tool.categories)\
         .filter(Tool.id != tool_id)\
         .filter(Tool.is_approved == True)\
         .filter(Category.id.in_([c.id for c in tool.categories]))\
@@ -136,17 +269,20 @@ def tool(tool_id):
         .limit(5)\
         .all()
     
-    return render_template('tool.html', tool=tool, comments=comments, similar_tools=similar_tools)
+    votes.load(tools=[tool], comments=comments)
+    
+    return render_template('tool.html', tool=tool, comments=comments, similar_tools=similar_tools,
+                           vote_totals=votes.totals(tools=[tool], comments=comments))
 
 @app.route('/add-comment/<int:tool_id>', methods=['POST'])
 @login_required
 def add_comment(tool_id):
     tool = Tool.query.get_or_404(tool_id)
-    content = bleach.clean(request.form.get('content') or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+    content = clean_html(request.form.get('content'))
     
     if not content:
         flash('Comment cannot be empty', 'danger')
-        return redirect(url_for('tool', tool_id=tool_id))
+        return redirect(url_for('tool', slug=tool.slug))
     
     comment = Comment(content=content, tool_id=tool_id, user_id=current_user.id)
     
@@ -158,23 +294,58 @@ def add_comment(tool_id):
         db.session.rollback()
         flash(f'Error adding comment: {str(e)}', 'danger')
     
-    return redirect(url_for('tool', tool_id=tool_id))
+    return redirect(url_for('tool', slug=tool.slug))
+
+@app.route('/vote/<any(tool, comment):kind>/<int:target_id>/<int(signed=True):value>', methods=['POST'])
+def vote(kind, target_id, value):
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Log in to vote'}), 401
+    if value not in (1, -1):
+        return jsonify({'error': 'Invalid vote'}), 400
+    _, _, target_model = votes.KINDS[kind]
+    if db.session.get(target_model, target_id) is None:
+        return jsonify({'error': 'Not found'}), 404
+    
+    try:
+        user_vote, total = votes.cast(kind, target_id, value)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error recording vote: {str(e)}")
+        return jsonify({'error': 'Could not record vote'}), 500
+    return jsonify({'vote': user_vote, 'votes': total})
+
+@app.context_processor
+def inject_user_votes():
+    # Filled by votes.load() in the views that show vote buttons
+    return {'user_votes': votes.current()}
 
 @app.route('/category/<int:category_id>')
-def category(category_id):
-    category = Category.query.get_or_404(category_id)
+@skip_user_lookup
+def category_by_id(category_id):
+    slug = CATEGORY_SLUGS.get(category_id)
+    if slug is None:
+        abort(404)
+    return redirect(url_for('category', slug=slug), code=301)
+
+@app.route('/category/<slug>')
+@read_replica
+def category(slug):
+    category = Category.query.filter_by(slug=slug).first_or_404()
     tools = Tool.query.filter_by(is_approved=True)\
+                     .options(*TOOL_LIST_OPTIONS)\
                      .filter(Tool.categories.contains(category))\
                      .order_by(desc(Tool.created_at))\
                      .all()
-    return render_template('category.html', category=category, tools=tools)
+    votes.load(tools=tools)
+    return render_template('category.html', category=category, tools=tools,
+                           vote_totals=votes.totals(tools=tools))
 
 @app.route('/submit-tool', methods=['GET', 'POST'])
 @login_required
 def submit_tool():
     if request.method == 'POST':
         name = request.form.get('name')
-        description = bleach.clean(request.form.get('description') or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+        description = clean_html(request.form.get('description'))
         url = request.form.get('url')
         image_url = request.form.get('image_url')
         youtube_url = request.form.get('youtube_url')
@@ -196,7 +367,6 @@ def submit_tool():
         if not categories:
             flash('Please select at least one valid category', 'danger')
             return redirect(url_for('submit_tool'))
-        tool.categories = categories
         
         resource_titles = request.form.getlist('resource_titles[]')
         resource_urls = request.form.getlist('resource_urls[]')
@@ -204,10 +374,11 @@ def submit_tool():
         for title, url in zip(resource_titles, resource_urls):
             if title and url:
                 resources.append({'title': title, 'url': url})
-        tool.resources = json.dumps(resources)
+        tool.resources = resources
         
         try:
-            db.session.add(tool)
+            slugs.assign_slug(tool, name, fallback='tool')
+            tool.categories = categories
             db.session.commit()
             flash('Tool submitted successfully! It will be reviewed by moderators.', 'success')
             return redirect(url_for('index'))
@@ -230,7 +401,7 @@ def edit_tool(tool_id):
     
     if request.method == 'POST':
         name = request.form.get('name')
-        description = bleach.clean(request.form.get('description') or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+        description = clean_html(request.form.get('description'))
         url = request.form.get('url')
         image_url = request.form.get('image_url')
         youtube_url = request.form.get('youtube_url')
@@ -259,11 +430,11 @@ def edit_tool(tool_id):
             for title, url in zip(resource_titles, resource_urls):
                 if title and url:
                     resources.append({'title': title, 'url': url})
-            tool.resources = json.dumps(resources)
+            tool.resources = resources
             
             db.session.commit()
             flash('Tool updated successfully!', 'success')
-            return redirect(url_for('tool', tool_id=tool_id))
+            return redirect(url_for('tool', slug=tool.slug))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating tool: {str(e)}', 'danger')
@@ -1,5 +1,6 @@
 from app import app, db
 from models import Category, Tool, User, AppearanceSettings
+import slugs
 
 def seed_data():
     # Clear existing data
@@ -53,7 +54,7 @@ def seed_data():
         cat = Category()
         cat.name = name
         cat.description = description
-        db.session.add(cat)
+        slugs.assign_slug(cat, name, fallback='category')
         db.session.commit()  # Commit each category to get its ID
         category_objects[name] = cat
     
@@ -92,8 +93,8 @@ def seed_data():
         tool.url = tool_data['url']
         tool.user_id = moderator.id
         tool.is_approved = True
+        slugs.assign_slug(tool, tool.name, fallback='tool')
         tool.categories = [category_objects[cat_name] for cat_name in tool_data['categories']]
-        db.session.add(tool)
     
     db.session.commit()
     print("Database seeded successfully!")
@@ -0,0 +1,121 @@
+import re
+import time
+from app import db
+from sqlalchemy.exc import IntegrityError
+
+# Room left in the column for a "-<n>" suffix
+SUFFIX_ROOM = 10
+MAX_ATTEMPTS = 5
+
+def slugify(text, max_length=200 - SUFFIX_ROOM):
+    slug = re.sub(r'[^\w\s-]', '', (text or '').lower())
+    slug = re.sub(r'[-\s]+', '-', slug).strip('-')
+    return slug[:max_length].rstrip('-')
+
+def base_slug(text, fallback='item'):
+    slug = slugify(text) or fallback
+    # All-digit slugs would be taken for the numeric ids that old URLs use
+    if slug.isdigit():
+        slug = f"{fallback}-{slug}"
+    return slug
+
+def allocate_slug(column, base_slug, exclude_id=None):
+    """Return base_slug, or base_slug-<n> with the smallest free n, in one query.
+
+    The base and every "base-..." variant are fetched together; the prefix
+    match uses the slug index (on Postgres, the text_pattern_ops index added
+    by the slug migrations).
+    """
+    model = column.class_
+    query = db.session.query(column).filter(
+        db.or_(column == base_slug, column.startswith(base_slug + '-', autoescape=True))
+    )
+    if exclude_id is not None:
+        query = query.filter(model.id != exclude_id)
+    taken = {slug for (slug,) in query}
+    if base_slug not in taken:
+        return base_slug
+
+    suffix = re.compile(re.escape(base_slug) + r'-(\d+)$')
+    used = {int(match.group(1)) for match in map(suffix.match, taken) if match}
+    counter = 1
+    while counter in used:
+        counter += 1
+    return f"{base_slug}-{counter}"
+
+def assign_slug(obj, text, field='slug', fallback='item'):
+    """Give obj a unique slug, add it to the session and flush it.
+
+    Two concurrent saves can allocate the same slug; the unique constraint
+    rejects the second write, which is rolled back to a savepoint and
+    retried with a fresh allocation. Pass new objects before adding them to
+    the session or relating them to loaded rows: begin_nested() flushes
+    pending objects first, which would put their INSERT outside the savepoint.
+    """
+    column = getattr(type(obj), field)
+    base = base_slug(text, fallback)
+    for attempt in range(MAX_ATTEMPTS):
+        # Don't let the lookup flush obj before it has its slug
+        with db.session.no_autoflush:
+            slug = allocate_slug(column, base, exclude_id=obj.id)
+        try:
+            with db.session.begin_nested():
+                setattr(obj, field, slug)
+                db.session.add(obj)
+                db.session.flush()
+            return slug
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+
+class SlugAllocator:
+    """Allocates slugs for many new rows against one up-front query.
+
+    For imports, seeding and backfills, where a query per row adds up. There
+    is no retry: a concurrent write of the same slug fails the whole batch on
+    the unique constraint.
+    """
+
+    def __init__(self, column):
+        self.taken = {slug for (slug,) in db.session.query(column).filter(column.isnot(None))}
+
+    def allocate(self, text, fallback='item'):
+        base = base_slug(text, fallback)
+        slug = base
+        counter = 1
+        while slug in self.taken:
+            slug = f"{base}-{counter}"
+            counter += 1
+        self.taken.add(slug)
+        return slug
+
+class SlugMap:
+    """In-memory id -> slug map of a model, for redirecting old numeric URLs.
+
+    Loaded with one query and reloaded after max_age seconds. An unknown id
+    reloads early at most once every min_reload seconds, so requests for ids
+    that don't exist can't turn into a query each.
+    """
+
+    def __init__(self, model, max_age=300, min_reload=10):
+        self.model = model
+        self.max_age = max_age
+        self.min_reload = min_reload
+        self._slugs = None
+        self._loaded = 0.0
+
+    def _load(self, now):
+        model = self.model
+        rows = db.session.query(model.id, model.slug).filter(model.slug.isnot(None))
+        self._slugs = dict(rows)
+        self._loaded = now
+
+    def get(self, id):
+        now = time.monotonic()
+        if self._slugs is None or now - self._loaded > self.max_age:
+            self._load(now)
+        slug = self._slugs.get(id)
+        if slug is None and now - self._loaded >= self.min_reload:
+            self._load(now)
+            slug = self._slugs.get(id)
+        return slug
@@ -8,7 +8,11 @@ function vote(type, id, value) {
             console.error(data.error);
             return;
         }
-        document.querySelector(`#${type}-${id}-votes`).textContent = data.votes;
+        const count = document.querySelector(`#${type}-${id}-votes`);
+        count.textContent = data.votes;
+        count.parentElement.querySelectorAll('.vote-arrow').forEach(arrow => {
+            arrow.classList.toggle('voted', Number(arrow.dataset.value) === data.vote);
+        });
     })
     .catch(error => console.error('Error:', error));
 }
@@ -19,6 +19,7 @@ CREATE TABLE users (
 CREATE TABLE categories (
   id SERIAL PRIMARY KEY,
   name VARCHAR(100) NOT NULL,
+  slug VARCHAR(200) UNIQUE,
   description TEXT,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
   updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -28,12 +29,14 @@ CREATE TABLE categories (
 CREATE TABLE tools (
   id SERIAL PRIMARY KEY,
   name VARCHAR(200) NOT NULL,
+  slug VARCHAR(200) UNIQUE,
   description TEXT NOT NULL,
   url VARCHAR(500) NOT NULL,
   image_url VARCHAR(500),
   youtube_url VARCHAR(500),
+  youtube_video_id VARCHAR(11),
   is_approved BOOLEAN DEFAULT FALSE,
-  resources TEXT,
+  resources JSONB DEFAULT '[]'::jsonb,
   user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
   updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -67,6 +70,8 @@ CREATE TABLE blog_posts (
   published BOOLEAN DEFAULT FALSE,
   featured_image VARCHAR(500),
   excerpt TEXT,
+  preview TEXT,
+  reading_minutes INTEGER,
   user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
   updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -127,25 +132,25 @@ INSERT INTO appearance_settings (primary_color, secondary_color, background_colo
 VALUES ('#0d6efd', '#6c757d', '#212529', '#ffffff', '#0d6efd', '#6c757d');
 
 -- Insert default categories
-INSERT INTO categories (name, description) VALUES
-  ('AI Writing', 'AI-powered writing and content creation tools'),
-  ('AI Image Generation', 'Tools for creating images with AI'),
-  ('AI Video', 'AI video creation and editing tools'),
-  ('AI Chatbots', 'Chatbot and conversational AI tools'),
-  ('AI Research', 'Research and analysis AI tools'),
-  ('AI Productivity', 'Productivity and workflow AI tools'),
-  ('AI Development', 'AI tools for developers'),
-  ('AI Business', 'Business and marketing AI tools');
+INSERT INTO categories (name, slug, description) VALUES
+  ('AI Writing', 'ai-writing', 'AI-powered writing and content creation tools'),
+  ('AI Image Generation', 'ai-image-generation', 'Tools for creating images with AI'),
+  ('AI Video', 'ai-video', 'AI video creation and editing tools'),
+  ('AI Chatbots', 'ai-chatbots', 'Chatbot and conversational AI tools'),
+  ('AI Research', 'ai-research', 'Research and analysis AI tools'),
+  ('AI Productivity', 'ai-productivity', 'Productivity and workflow AI tools'),
+  ('AI Development', 'ai-development', 'AI tools for developers'),
+  ('AI Business', 'ai-business', 'Business and marketing AI tools');
 
 -- Insert admin user (password: admin123)
 INSERT INTO users (username, email, password_hash, is_admin, is_moderator) 
 VALUES ('admin', 'admin@choosemyai.com', '$2a$10$92IXUNpkjO0rOQ5byMi.Ye4oKoEa3Ro9llC/.og/at2.uheWG/igi', true, true);
 
 -- Insert sample tools
-INSERT INTO tools (name, description, url, image_url, user_id, is_approved) VALUES
-  ('ChatGPT', 'Advanced language model for conversation and text generation', 'https://chat.openai.com', 'https://via.placeholder.com/300x200?text=ChatGPT', 1, true),
-  ('Midjourney', 'AI art generation tool for creating stunning images', 'https://midjourney.com', 'https://via.placeholder.com/300x200?text=Midjourney', 1, true),
-  ('GitHub Copilot', 'AI-powered code completion and generation tool', 'https://github.com/features/copilot', 'https://via.placeholder.com/300x200?text=GitHub+Copilot', 1, true);
+INSERT INTO tools (name, slug, description, url, image_url, user_id, is_approved) VALUES
+  ('ChatGPT', 'chatgpt', 'Advanced language model for conversation and text generation', 'https://chat.openai.com', 'https://via.placeholder.com/300x200?text=ChatGPT', 1, true),
+  ('Midjourney', 'midjourney', 'AI art generation tool for creating stunning images', 'https://midjourney.com', 'https://via.placeholder.com/300x200?text=Midjourney', 1, true),
+  ('GitHub Copilot', 'github-copilot', 'AI-powered code completion and generation tool', 'https://github.com/features/copilot', 'https://via.placeholder.com/300x200?text=GitHub+Copilot', 1, true);
 
 -- Associate tools with categories
 INSERT INTO tool_categories (tool_id, category_id) VALUES
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+import pytest
+from flask_login import login_user
+from main import app
+from app import db
+from models import Tool, ToolVote, ToolVoteDaily, User
+import rollups
+import votes
+
+@pytest.fixture
+def tool(monkeypatch):
+    # Count votes as soon as they are cast
+    monkeypatch.setattr(rollups, 'SETTLE_SECONDS', 0)
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x') for i in range(3)]
+        db.session.add_all(users)
+        db.session.flush()
+        tool = Tool(name='Tool', slug='tool', description='<p>A tool</p>', url='https://example.com', user_id=users[0].id,
+                    is_approved=True)
+        db.session.add(tool)
+        db.session.commit()
+        yield tool.id, [user.id for user in users]
+        db.session.remove()
+        db.drop_all()
+
+def _cast(user_id, tool_id, *values):
+    for value in values:
+        with app.test_request_context():
+            login_user(db.session.get(User, user_id))
+            votes.cast('tool', tool_id, value)
+
+def _daily(tool_id):
+    return [(row.upvotes, row.downvotes) for row in ToolVoteDaily.query.filter_by(tool_id=tool_id)]
+
+def test_withdrawn_vote_is_not_counted(tool):
+    tool_id, (first, second, _) = tool
+    with app.app_context():
+        _cast(first, tool_id, 1, 1)
+        _cast(second, tool_id, -1, -1)
+        rollups.refresh_tool_vote_daily()
+        assert _daily(tool_id) == [(0, 0)]
+
+def test_flipped_vote_moves_between_sides(tool):
+    tool_id, (first, second, third) = tool
+    with app.app_context():
+        # Ends on one downvote
+        _cast(first, tool_id, 1, 1, -1, -1, 1, -1)
+        _cast(second, tool_id, -1, 1)
+        _cast(third, tool_id, 1)
+        rollups.refresh_tool_vote_daily()
+        assert _daily(tool_id) == [(2, 1)]
+        assert db.session.query(db.func.sum(ToolVote.value)).scalar() == 1
+        assert rollups.leaderboard(1)[0][3:] == (2, 1)
+
+def test_refresh_in_batches_matches_rebuild(tool):
+    tool_id, (first, second, _) = tool
+    with app.app_context():
+        _cast(first, tool_id, 1)
+        rollups.refresh_tool_vote_daily()
+        # Flipped after the first vote was already rolled up
+        _cast(first, tool_id, -1)
+        _cast(second, tool_id, 1, 1, 1)
+        rollups.refresh_tool_vote_daily(batch_size=1)
+        counted = _daily(tool_id)
+        rollups.rebuild_tool_vote_daily()
+        assert counted == _daily(tool_id) == [(1, 1)]
@@ -0,0 +1,63 @@
+import threading
+import time
+from flask_login import UserMixin
+import metrics
+
+# Short enough that a role change made in another worker is picked up quickly
+DEFAULT_TTL = 60
+
+class CachedUser(UserMixin):
+    """Lightweight, session-independent stand-in for models.User.
+
+    Only carries what templates and permission checks read from current_user.
+    Views that need the full row (e.g. to change a password) should load it with
+    User.query.get(current_user.id).
+    """
+
+    def __init__(self, id, username, is_admin, is_moderator):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+        self.is_moderator = bool(is_moderator)
+
+    def __repr__(self):
+        return f'<CachedUser {self.id} {self.username}>'
+
+_cache = {}
+_lock = threading.Lock()
+
+def get_user(user_id, ttl=DEFAULT_TTL):
+    """Return a CachedUser for user_id, hitting the database at most once per ttl."""
+    now = time.monotonic()
+    entry = _cache.get(user_id)
+    if entry is not None and entry[0] > now:
+        metrics.inc('cache_requests_total', cache='user', result='hit')
+        return entry[1]
+    metrics.inc('cache_requests_total', cache='user', result='miss')
+
+    from app import db
+    from models import User
+    row = db.session.query(User.id, User.username, User.is_admin, User.is_moderator)\
+        .filter(User.id == user_id)\
+        .first()
+    user = CachedUser(*row) if row else None
+
+    with _lock:
+        if user is None:
+            _cache.pop(user_id, None)
+        else:
+            _cache[user_id] = (now + ttl, user)
+    return user
+
+def invalidate_user(user_id):
+    with _lock:
+        _cache.pop(user_id, None)
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+def skip_user_lookup(view):
+    """Mark a view that never reads current_user so the user loader can skip it."""
+    view.skip_user_lookup = True
+    return view
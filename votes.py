@@ -0,0 +1,104 @@
+from flask import g, has_request_context
+from flask_login import current_user
+from sqlalchemy import func, literal, select, union_all
+from app import db
+from models import Comment, CommentVote, Tool, ToolVote, User
+
+# kind -> (vote model, column of the voted-on row, voted-on model)
+KINDS = {
+    'tool': (ToolVote, ToolVote.tool_id, Tool),
+    'comment': (CommentVote, CommentVote.comment_id, Comment),
+}
+
+def _direction(total):
+    # 1, -1 or 0; clamps rows left over from before votes could be withdrawn
+    return (total > 0) - (total < 0)
+
+def _ids(items):
+    return {item if isinstance(item, int) else item.id for item in items}
+
+def _sums(wanted, user_id=None):
+    # UNION ALL of one grouped IN query per kind that has ids: rows of (kind, id, sum)
+    selects = []
+    for kind, ids in wanted.items():
+        if ids:
+            model, column, _ = KINDS[kind]
+            query = select(literal(kind), column, func.sum(model.value)).where(column.in_(ids))
+            if user_id is not None:
+                query = query.where(model.user_id == user_id)
+            selects.append(query.group_by(column))
+    if not selects:
+        return None
+    return selects[0] if len(selects) == 1 else union_all(*selects)
+
+def current():
+    """This request's {'tool': {id: vote}, 'comment': {id: vote}} for the current user.
+
+    Only ids passed to load() are present; vote is 1, -1, or 0 for no vote.
+    """
+    if not has_request_context():
+        return {kind: {} for kind in KINDS}
+    state = g.get('user_votes')
+    if state is None:
+        state = g.user_votes = {kind: {} for kind in KINDS}
+    return state
+
+def load(tools=(), comments=()):
+    """Fetch the current user's votes on the given tools and comments (rows or ids).
+
+    One query covers both kinds; ids already loaded during this request are
+    not asked for again. Anonymous users get 0 everywhere. Returns current().
+    """
+    state = current()
+    wanted = {'tool': _ids(tools) - state['tool'].keys(),
+              'comment': _ids(comments) - state['comment'].keys()}
+    if not any(wanted.values()):
+        return state
+    for kind, ids in wanted.items():
+        state[kind].update(dict.fromkeys(ids, 0))
+    if not current_user.is_authenticated:
+        return state
+
+    for kind, target_id, total in db.session.execute(_sums(wanted, current_user.id)):
+        state[kind][target_id] = _direction(total or 0)
+    return state
+
+def totals(tools=(), comments=()):
+    """Vote totals of the given tools and comments (rows or ids), in one query.
+
+    For lists, instead of Tool.vote_count / Comment.vote_count per row.
+    Returns {'tool': {id: total}, 'comment': {id: total}} with every id given.
+    """
+    wanted = {'tool': _ids(tools), 'comment': _ids(comments)}
+    result = {kind: dict.fromkeys(ids, 0) for kind, ids in wanted.items()}
+    statement = _sums(wanted)
+    if statement is not None:
+        for kind, target_id, total in db.session.execute(statement):
+            result[kind][target_id] = total or 0
+    return result
+
+def invalidate():
+    g.pop('user_votes', None)
+
+def cast(kind, target_id, value):
+    """Record the current user's vote (1 or -1) on a tool or comment.
+
+    Voting the same way twice withdraws the vote. Vote rows are never
+    updated: a change is stored as a new row holding the difference and
+    the total before it, so sums stay correct and rollups.py only ever
+    sees inserts.
+    Returns (the user's vote now, the new total).
+    """
+    model, column, _ = KINDS[kind]
+    # Serialize this user's votes, so a double click can't count twice
+    db.session.query(User.id).filter(User.id == current_user.id).with_for_update().scalar()
+    total = db.session.query(func.sum(model.value))\
+        .filter(model.user_id == current_user.id, column == target_id)\
+        .scalar() or 0
+    after = 0 if value == _direction(total) else value
+    db.session.add(model(**{column.key: target_id, 'user_id': current_user.id,
+                            'value': after - total, 'previous': total}))
+    db.session.commit()
+    invalidate()
+    votes = db.session.query(func.sum(model.value)).filter(column == target_id).scalar() or 0
+    return after, votes
@@ -0,0 +1,26 @@
+import re
+
+YOUTUBE_REGEX = re.compile(
+    r'(?:https?:\/\/)?'
+    r'(?:www\.)?'
+    r'(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|'
+    r'youtu\.be\/)([a-zA-Z0-9_-]{11})'
+)
+
+def extract_video_id(youtube_url):
+    """Return the 11 character video id from a YouTube URL, or None."""
+    if not youtube_url:
+        return None
+    match = YOUTUBE_REGEX.search(youtube_url)
+    return match.group(1) if match else None
+
+def embed_url(video_id, autoplay=False):
+    if not video_id:
+        return None
+    url = f'https://www.youtube.com/embed/{video_id}'
+    return f'{url}?autoplay=1' if autoplay else url
+
+def thumbnail_url(video_id):
+    if not video_id:
+        return None
+    return f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'